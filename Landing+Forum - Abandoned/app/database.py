@@ -1,22 +1,188 @@
-from sqlalchemy import create_engine
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.config import settings
 
 Base = declarative_base()
 
+
+def sqlite_pragmas() -> dict[str, object]:
+    # wal lets readers carry on while a writer commits, and with wal a
+    # normal sync only risks the last commits on power loss, never
+    # corruption. a negative cache_size is in KiB
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+        "busy_timeout": settings.sqlite_busy_timeout,
+    }
+
+
+def install_pragmas(engine: Engine, pragmas: dict[str, object]) -> None:
+    if engine.url.get_backend_name() != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def pool_options(url: str) -> dict[str, object]:
+    url = make_url(url)
+
+    # in-memory databases live on a single connection and take no sizing
+    if url.get_backend_name() == "sqlite" and url.database in (
+        None, "", ":memory:"
+    ):
+        return {}
+
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+
+
+# scripts, migrations and the background workers keep the blocking engine.
+# their writes go through their own connections and wait on sqlite's
+# busy_timeout, the single writer below only orders the request handlers
 engine = create_engine(
     settings.db_url,
     connect_args={"check_same_thread": False},
     echo=settings.debug,
+    **pool_options(settings.db_url),
 )
+install_pragmas(engine, sqlite_pragmas() if settings.sqlite_tuning else {})
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def async_db_url(url: str) -> str:
+    url = make_url(url)
+
+    if url.drivername in ("sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+
+    return url.render_as_string(hide_password=False)
+
+
+def read_only_url(url: str) -> Optional[str]:
+    url = make_url(async_db_url(url))
+
+    if url.get_backend_name() != "sqlite" or url.database in (
+        None, "", ":memory:"
+    ):
+        return None
+
+    return url.set(
+        database=f"file:{url.database}",
+        query={**url.query, "mode": "ro", "uri": "true"},
+    ).render_as_string(hide_password=False)
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+_write_waiting = 0
+
+
+def limit_write_queue(engine: Engine) -> None:
+    # counts requests waiting for the writer's connection rather than open
+    # writer sessions, which may render or buffer before their first
+    # statement. past the limit, failing fast beats piling up requests that
+    # would time out waiting anyway
+    raw_connection = engine.raw_connection
+
+    def queued_raw_connection():
+        global _write_waiting
+
+        if _write_waiting >= settings.db_write_queue_size:
+            raise WriteQueueFull()
+
+        _write_waiting += 1
+        try:
+            return raw_connection()
+        finally:
+            _write_waiting -= 1
+
+    engine.raw_connection = queued_raw_connection
+
+
+# request handlers run on the event loop, so they talk to the database
+# through aiosqlite instead of blocking the loop on every query
+_read_url = read_only_url(settings.db_url)
+
+if _read_url is None:
+    # in-memory and server databases keep a single shared pool
+    write_engine = read_engine = create_async_engine(
+        async_db_url(settings.db_url),
+        echo=settings.debug,
+        **pool_options(settings.db_url),
+    )
+    install_pragmas(
+        write_engine.sync_engine,
+        sqlite_pragmas() if settings.sqlite_tuning else {},
+    )
+else:
+    # sqlite takes one writer at a time, so writes from request handlers
+    # share a single connection and wait their turn for it instead of
+    # colliding on the file lock
+    write_engine = create_async_engine(
+        async_db_url(settings.db_url),
+        echo=settings.debug,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    limit_write_queue(write_engine.sync_engine)
+    install_pragmas(
+        write_engine.sync_engine,
+        sqlite_pragmas() if settings.sqlite_tuning else {},
+    )
+
+    # readers get their own pool of connections that cannot write, which
+    # in wal mode never wait on the writer
+    read_engine = create_async_engine(
+        _read_url,
+        echo=settings.debug,
+        **pool_options(settings.db_url),
+    )
+
+    # journal_mode is a property of the file, only the writer may set it
+    install_pragmas(
+        read_engine.sync_engine,
+        {
+            name: value
+            for name, value in sqlite_pragmas().items()
+            if name != "journal_mode"
+        } if settings.sqlite_tuning else {},
+    )
+
+# loaded objects stay readable after commit, since touching an expired
+# attribute would need io outside of an await
+ReadSessionLocal = async_sessionmaker(
+    read_engine, autoflush=False, expire_on_commit=False
+)
+WriteSessionLocal = async_sessionmaker(
+    write_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
+
+
+async def get_write_db():
+    async with WriteSessionLocal() as db:
         yield db
-    finally:
-        db.close()
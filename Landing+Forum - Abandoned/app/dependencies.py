@@ -1,22 +1,28 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, desc, and_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_read_db
 
 from app.services.auth import decode_access_token
+from app.services.principals import Principal, load_principal
 
 security = HTTPBearer(auto_error=False)
 
 
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_read_db),
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -33,7 +39,7 @@ async def get_current_user(
     if token_data is None or token_data.user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = await load_principal(db, token_data.user_id)
 
     if user is None:
         raise credentials_exception
@@ -49,8 +55,8 @@ async def get_current_user(
 
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db),
-) -> Optional[User]:
+    db: AsyncSession = Depends(get_read_db),
+) -> Optional[Principal]:
     if credentials is None:
         return None
 
@@ -59,7 +65,7 @@ async def get_current_user_optional(
     if token_data is None or token_data.user_id is None:
         return None
 
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = await load_principal(db, token_data.user_id)
 
     if user is None or not user.is_active:
         return None
@@ -67,14 +73,198 @@ async def get_current_user_optional(
     return user
 
 
+async def get_current_admin(
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="admin access required",
+        )
+
+    return current_user
+
+
+def encode_cursor(key: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+
+    payload = json.dumps([key, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, object, int]:
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="invalid cursor",
+    )
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise invalid_cursor
+
+    if (
+        not isinstance(key, str)
+        or not isinstance(row_id, int)
+        or isinstance(row_id, bool)
+        or not isinstance(value, (str, int, float, type(None)))
+    ):
+        raise invalid_cursor
+
+    return key, value, row_id
+
+
+def cursor_value(column, value):
+    # the value ends up compared against the column, and sqlite compares
+    # text and numbers without complaint, so it has to carry the column's type
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="invalid cursor",
+    )
+    python_type = column.type.python_type
+
+    if value is None:
+        if not column.nullable:
+            raise invalid_cursor
+        return None
+
+    if isinstance(value, bool):
+        raise invalid_cursor
+
+    if python_type is int:
+        if not isinstance(value, int):
+            raise invalid_cursor
+        return value
+
+    if python_type is float:
+        if not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise invalid_cursor
+        return float(value)
+
+    if python_type is datetime:
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise invalid_cursor
+
+        # stored timestamps are naive utc
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    raise invalid_cursor
+
+
 class Pagination:
     def __init__(
         self,
         page: int = 1,
         page_size: int = 20,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None,
     ):
         from app.config import settings
 
         self.page = max(1, page)
         self.page_size = min(max(1, page_size), settings.max_page_size)
         self.offset = (self.page - 1) * self.page_size
+
+        self.cursor = decode_cursor(cursor) if cursor else None
+        # cache keys use the string the client sent, never decoded values
+        self.raw_cursor = cursor.rstrip("=") if cursor else None
+
+        # counting every matching row is what makes deep pages expensive, so
+        # cursor requests skip it unless asked for
+        if include_total is None:
+            include_total = self.cursor is None
+        self.include_total = include_total
+
+    def total_pages(self, total: Optional[int]) -> Optional[int]:
+        if total is None:
+            return None
+        return (total + self.page_size - 1) // self.page_size
+
+    async def paginate(
+        self, db: AsyncSession, statement: Select, column, id_column
+    ) -> tuple[list, Optional[str]]:
+        statement = statement.order_by(desc(column), desc(id_column))
+
+        if self.cursor is not None:
+            statement = statement.where(self._after_cursor(column, id_column))
+        else:
+            statement = statement.offset(self.offset)
+
+        rows = (
+            await db.scalars(statement.limit(self.page_size + 1))
+        ).all()
+
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                column.key,
+                getattr(last, column.key),
+                getattr(last, id_column.key),
+            )
+
+        return rows, next_cursor
+
+    async def paginate_by_offset(
+        self, db: AsyncSession, statement: Select
+    ) -> tuple[list, Optional[str]]:
+        # for orderings that cannot be keyed, such as search rank, the
+        # cursor just carries the next offset
+        offset = self.offset
+
+        if self.cursor is not None:
+            key, value, _ = self.cursor
+
+            if (
+                key != "offset"
+                or not isinstance(value, int)
+                or isinstance(value, bool)
+                or value < 0
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="cursor does not match the requested sort",
+                )
+
+            offset = value
+
+        rows = (
+            await db.execute(
+                statement.offset(offset).limit(self.page_size + 1)
+            )
+        ).all()
+
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            next_cursor = encode_cursor(
+                "offset", offset + self.page_size, 0
+            )
+
+        return rows, next_cursor
+
+    def _after_cursor(self, column, id_column):
+        key, value, row_id = self.cursor
+
+        if key != column.key:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="cursor does not match the requested sort",
+            )
+
+        # sqlite sorts nulls last in descending order. published papers
+        # always carry published_at, so only a cursor that already sits in
+        # the null tail needs to stay there
+        value = cursor_value(column, value)
+
+        if value is None:
+            return and_(column.is_(None), id_column < row_id)
+
+        return tuple_(column, id_column) < tuple_(value, row_id)
@@ -1,15 +1,154 @@
+import asyncio
+import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
+from app.database import (
+    SessionLocal,
+    WriteQueueFull,
+    engine,
+    read_engine,
+    write_engine,
+)
 from app.routers import router
+from app.services.auth import PasswordHasherBusy, password_hasher
+from app.services.cache import feed_cache
+from app.services.events import event_bus
+from app.services.handlers import register_handlers
+from app.services.metrics import (
+    REQUESTS_IN_PROGRESS,
+    instrument_pool,
+    mark_process_dead,
+    observe_request,
+    observe_threadpools,
+    render_metrics,
+)
+from app.services.query_stats import (
+    check_repeated,
+    instrument_engine,
+    track_queries,
+)
+from app.services.principals import (
+    AUTH_INVALIDATION_POLL_INTERVAL,
+    AUTH_INVALIDATION_PRUNE_INTERVAL,
+    prune_invalidations,
+    sync_invalidations,
+)
+from app.services.leaderboard import (
+    LEADERBOARD_REBUILD_INTERVAL, leaderboard
+)
+from app.services.vote_buffer import start_vote_buffer, stop_vote_buffer
+from app.services.trending import (
+    TRENDING_DECAY_INTERVAL, decay_trending_scores
+)
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_leaderboard():
+    db = SessionLocal()
+    try:
+        leaderboard.rebuild(db)
+    finally:
+        db.close()
+
+
+def decay_trending():
+    db = SessionLocal()
+    try:
+        if decay_trending_scores(db):
+            feed_cache.invalidate()
+    finally:
+        db.close()
+
+
+def poll_auth_invalidations():
+    db = SessionLocal()
+    try:
+        sync_invalidations(db)
+    finally:
+        db.close()
+
+
+def prune_auth_invalidations():
+    db = SessionLocal()
+    try:
+        prune_invalidations(db)
+    finally:
+        db.close()
+
+
+async def run_periodically(job, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception("periodic job %s failed", job.__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    register_handlers(event_bus)
+    event_bus.start()
+
+    if settings.vote_buffer_enabled:
+        await run_in_threadpool(
+            start_vote_buffer, SessionLocal, settings.vote_journal_dir
+        )
+
+    await run_in_threadpool(rebuild_leaderboard)
+    await run_in_threadpool(poll_auth_invalidations)
+
+    tasks = [
+        asyncio.create_task(
+            run_periodically(decay_trending, TRENDING_DECAY_INTERVAL)
+        ),
+        asyncio.create_task(
+            run_periodically(
+                rebuild_leaderboard, LEADERBOARD_REBUILD_INTERVAL
+            )
+        ),
+        asyncio.create_task(
+            run_periodically(
+                poll_auth_invalidations, AUTH_INVALIDATION_POLL_INTERVAL
+            )
+        ),
+        asyncio.create_task(
+            run_periodically(
+                prune_auth_invalidations, AUTH_INVALIDATION_PRUNE_INTERVAL
+            )
+        ),
+    ]
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    await run_in_threadpool(stop_vote_buffer)
+    await run_in_threadpool(event_bus.stop)
+    await run_in_threadpool(password_hasher.shutdown)
+
+    mark_process_dead()
+
 
 app = FastAPI(
     title=settings.name,
     docs_url="/api/docs",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -20,9 +159,118 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+def mounted_route_path(route) -> Optional[str]:
+    # routes of the included api router report their path below its prefix,
+    # only the ones declared on the app itself carry the full path
+    path = getattr(route, "path", None)
+
+    if path is None or route in app.routes:
+        return path
+
+    return router.prefix + path
+
+
+if settings.sql_instrumentation:
+    for instrumented in (
+        engine, write_engine.sync_engine, read_engine.sync_engine
+    ):
+        instrument_engine(instrumented)
+
+    @app.middleware("http")
+    async def track_request_queries(request: Request, call_next):
+        started = time.perf_counter()
+
+        with track_queries() as stats:
+            response = await call_next(request)
+
+        response.headers["Server-Timing"] = ", ".join([
+            stats.server_timing(),
+            f"total;dur={(time.perf_counter() - started) * 1000:.2f}",
+        ])
+
+        # repeated statements are almost always a lookup inside a loop.
+        # strict mode is meant for tests, where it turns one into a failure
+        path = mounted_route_path(request.scope.get("route"))
+        check_repeated(
+            stats,
+            settings.sql_repeat_limit,
+            settings.sql_repeat_strict,
+            f"{request.method} {path or request.url.path}",
+        )
+
+        return response
+
+
+instrument_pool(engine, "sync")
+instrument_pool(write_engine.sync_engine, "write")
+if read_engine is not write_engine:
+    instrument_pool(read_engine.sync_engine, "read")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    observe_threadpools(password_hasher.workers, password_hasher.pending)
+    started = time.perf_counter()
+    status = 500
+
+    try:
+        with REQUESTS_IN_PROGRESS.labels(request.method).track_inprogress():
+            response = await call_next(request)
+        status = response.status_code
+    finally:
+        observe_request(
+            request.method,
+            mounted_route_path(request.scope.get("route")),
+            status,
+            time.perf_counter() - started,
+        )
+
+    return response
+
+
 app.include_router(router)
 
 
+@app.get("/api/metrics", include_in_schema=False)
+def metrics(request: Request):
+    # scrapers authenticate with a static token, the endpoint does not
+    # exist until one is configured
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    expected = f"Bearer {settings.metrics_token}"
+    given = request.headers.get("authorization", "")
+    if not secrets.compare_digest(given.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "server busy, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(WriteQueueFull)
+@app.exception_handler(PoolTimeoutError)
+async def database_busy(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "server busy, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 frontend_path = Path(__file__).parent.parent / "frontend"
 if frontend_path.exists():
     app.mount(
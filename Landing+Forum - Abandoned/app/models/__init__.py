@@ -1,6 +1,9 @@
 from app.models.user import User, UserRole
 from app.models.paper import Paper
 from app.models.vote import Vote
+from app.models.tag import Tag, paper_tags
+from app.models.counter import Counter
+from app.models.auth_invalidation import AuthInvalidation
 
 __all__ = [
     # User
@@ -10,4 +13,11 @@ __all__ = [
     "Paper",
     # Vote
     "Vote",
+    # Tag
+    "Tag",
+    "paper_tags",
+    # Counter
+    "Counter",
+    # AuthInvalidation
+    "AuthInvalidation",
 ]
@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer
+
+from app.database import Base
+
+
+class AuthInvalidation(Base):
+    __tablename__ = "auth_invalidations"
+
+    # ids are never reused, so a worker's last seen id stays meaningful
+    # after old rows are pruned
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+
+    user_id = Column(Integer, nullable=False)
+
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+        index=True,
+    )
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+
+from app.database import Base
+
+
+class Counter(Base):
+    __tablename__ = "counters"
+
+    scope = Column(String(128), primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
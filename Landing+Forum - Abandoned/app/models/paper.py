@@ -1,7 +1,15 @@
 from datetime import datetime, timezone
 
 from sqlalchemy import (
-    Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Text,
+    ForeignKey,
+    Boolean,
+    Float,
+    Index,
 )
 from sqlalchemy.orm import relationship
 
@@ -18,11 +26,13 @@ class Paper(Base):
     slug = Column(String(255), unique=True, index=True, nullable=False)
 
     content = Column(Text, nullable=False)
-
-    tags = Column(String(255), nullable=True)
+    content_html = Column(Text, nullable=True)
+    content_html_version = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)
 
     is_published = Column(Boolean, default=True, nullable=False)
     vote_count = Column(Integer, default=0, nullable=False)
+    trending_score = Column(Float, default=0.0, nullable=False)
 
     published_at = Column(DateTime, nullable=True)
     created_at = Column(
@@ -41,13 +51,23 @@ class Paper(Base):
     votes = relationship(
         "Vote", back_populates="paper", cascade="all, delete-orphan"
     )
+    tags = relationship(
+        "Tag", secondary="paper_tags", order_by="Tag.name", lazy="selectin"
+    )
+
+    # match the keyset orderings used by the listing endpoints
+    __table_args__ = (
+        Index("ix_papers_feed_recent", "is_published", "published_at", "id"),
+        Index("ix_papers_feed_top", "is_published", "vote_count", "id"),
+        Index(
+            "ix_papers_feed_trending", "is_published", "trending_score", "id"
+        ),
+        Index("ix_papers_author_created", "author_id", "created_at", "id"),
+        Index(
+            "ix_papers_author_published", "author_id", "published_at", "id"
+        ),
+    )
 
     @property
     def tags_list(self) -> list[str]:
-        if not self.tags:
-            return []
-        return [tag.strip() for tag in self.tags.split(",") if tag.strip()]
-
-    @tags_list.setter
-    def tags_list(self, value: list[str]):
-        self.tags = ",".join(tag.strip() for tag in value if tag.strip())
+        return [tag.name for tag in self.tags]
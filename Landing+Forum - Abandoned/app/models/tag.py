@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index
+
+from app.database import Base
+
+
+paper_tags = Table(
+    "paper_tags",
+    Base.metadata,
+    Column(
+        "paper_id",
+        Integer,
+        ForeignKey("papers.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "tag_id",
+        Integer,
+        ForeignKey("tags.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    # the primary key serves paper -> tags, this serves tag -> papers
+    Index("ix_paper_tags_tag_paper", "tag_id", "paper_id"),
+)
+
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(64), unique=True, index=True, nullable=False)
@@ -3,17 +3,24 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.dependencies import get_current_user
+from app.database import get_read_db, get_write_db
+from app.dependencies import get_current_admin, get_current_user
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token
 
 from app.services.auth import (
-    verify_password, get_password_hash, create_access_token
+    create_access_token,
+    get_password_hash_async,
+    password_hasher,
+    token_cache,
+    verify_password_async,
 )
+from app.services.events import UserRegistered, event_bus
+from app.services.principals import Principal, principal_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -23,29 +30,30 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
     response_model=Token,
     status_code=status.HTTP_201_CREATED
 )
-def register(
+async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    writer: AsyncSession = Depends(get_write_db),
 ):
-    existing_user = db.query(User).filter(
-        User.username == user_data.username
-    ).first()
+    existing_user = await db.scalar(
+        select(User).where(User.username == user_data.username)
+    )
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="username already registered",
         )
 
-    existing_email = db.query(User).filter(
-        User.email == user_data.email
-    ).first()
+    existing_email = await db.scalar(
+        select(User).where(User.email == user_data.email)
+    )
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="email already registered",
         )
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
 
     new_user = User(
         username=user_data.username,
@@ -53,9 +61,10 @@ def register(
         password=hashed_password,
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    writer.add(new_user)
+    await writer.commit()
+
+    await event_bus.publish_async(UserRegistered(new_user.id))
 
     access_token = create_access_token(
         data={"user_id": new_user.id, "username": new_user.username}
@@ -68,14 +77,17 @@ def register(
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    writer: AsyncSession = Depends(get_write_db),
 ):
-    user = db.query(User).filter(
-        (User.username == form_data.username) |
-        (User.email == form_data.username)
-    ).first()
+    user = await db.scalar(
+        select(User).where(
+            (User.username == form_data.username) |
+            (User.email == form_data.username)
+        )
+    )
 
     if not user:
         raise HTTPException(
@@ -86,7 +98,7 @@ def login(
             },
         )
 
-    if not verify_password(form_data.password, user.password):
+    if not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="incorrect username or password",
@@ -101,8 +113,12 @@ def login(
             detail="user account is deactivated",
         )
 
-    user.last_login = datetime.now(timezone.utc)
-    db.commit()
+    await writer.execute(
+        update(User).where(User.id == user.id).values(
+            last_login=datetime.now(timezone.utc)
+        )
+    )
+    await writer.commit()
 
     access_token = create_access_token(
         data={"user_id": user.id, "username": user.username}
@@ -116,6 +132,23 @@ def login(
 
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     return UserResponse.model_validate(current_user)
+
+
+@router.get("/hasher/stats")
+def password_hasher_stats(
+    current_user: Principal = Depends(get_current_admin),
+):
+    return password_hasher.stats()
+
+
+@router.get("/cache/stats")
+def auth_cache_stats(
+    current_user: Principal = Depends(get_current_admin),
+):
+    return {
+        "principals": principal_cache.stats(),
+        "tokens": token_cache.stats(),
+    }
@@ -4,16 +4,50 @@ import re
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.database import get_read_db, get_write_db
+
+from app.services.cache import feed_cache
+from app.services.counters import (
+    PUBLISHED_SCOPE,
+    author_scope,
+    get_count,
+    paper_scopes,
+    tag_scope,
+    update_counters,
+)
+from app.services.events import (
+    PaperCreated,
+    PaperDeleted,
+    PaperUpdated,
+    event_bus,
+    paper_state,
+)
+from app.services.stats import adjust_user_stats_async
+from app.services.markdown import (
+    RENDERER_VERSION,
+    content_hash,
+    render_markdown,
+    render_paper_content,
+)
+from app.services.preview import render_preview
+from app.services.principals import Principal
+from app.services.trending import refresh_trending_score
+from app.services.vote_buffer import get_vote_counts, get_voted_paper_ids
+from app.services.tags import normalize_tag, set_paper_tags_async
+from app.services.search import (
+    apply_search,
+    build_match_query,
+    format_snippet,
+)
 
-from sqlalchemy import desc
-from sqlalchemy.orm import Session, joinedload
-
-from app.database import get_db
-
-from app.services.stats import update_user_stats
-from app.services.markdown import render_markdown
-
-from app.models import User, Paper, Vote
+from app.models import User, Paper, Tag, Vote, paper_tags
 from app.schemas.paper import (
     PaperCreate,
     PaperUpdate,
@@ -26,11 +60,22 @@ from app.schemas.paper import (
 from app.schemas.user import UserResponse
 
 from app.dependencies import (
-    get_current_user, get_current_user_optional, Pagination
+    get_current_user,
+    get_current_user_optional,
+    get_current_admin,
+    Pagination,
 )
 
 router = APIRouter(prefix="/papers", tags=["Papers"])
 
+# listings are ordered by these columns and then by id, descending, which
+# is also what the keyset cursors encode
+SORT_COLUMNS = {
+    "recent": Paper.published_at,
+    "trending": Paper.trending_score,
+    "top": Paper.vote_count,
+}
+
 
 def generate_slug(title: str, paper_id: Optional[int] = None) -> str:
     slug = re.sub(r"[^\w\s-]", "", title.lower())
@@ -42,35 +87,83 @@ def generate_slug(title: str, paper_id: Optional[int] = None) -> str:
     return slug[:250]
 
 
+async def load_paper(db: AsyncSession, *criteria) -> Optional[Paper]:
+    # populate_existing reloads a paper this session already holds, so
+    # a response built after a write sees the committed row
+    return (await db.scalars(
+        select(Paper).options(
+            joinedload(Paper.author)
+        ).where(*criteria).execution_options(populate_existing=True)
+    )).first()
+
+
 def build_paper_response(
-    paper: Paper, current_user: Optional[User] = None
+    paper: Paper,
+    current_user: Optional[Principal] = None,
+    snippet: Optional[str] = None,
+    user_has_voted: Optional[bool] = None,
+    vote_count: Optional[int] = None,
 ) -> PaperResponse:
+    if vote_count is None:
+        vote_count = paper.vote_count
+
     return PaperResponse(
         id=paper.id,
         title=paper.title,
         slug=paper.slug,
         tags=paper.tags_list,
         author=UserResponse.model_validate(paper.author),
-        vote_count=paper.vote_count,
+        vote_count=vote_count,
         is_published=paper.is_published,
         created_at=paper.created_at,
         published_at=paper.published_at,
+        snippet=snippet,
+        user_has_voted=user_has_voted,
     )
 
 
-def build_paper_detail(
+async def load_voted_flags(
+    db: AsyncSession,
+    current_user: Optional[Principal],
+    papers: list[Paper],
+) -> dict[int, bool]:
+    if current_user is None:
+        return {}
+
+    paper_ids = [paper.id for paper in papers]
+    voted = await get_voted_paper_ids(db, current_user.id, paper_ids)
+
+    return {paper_id: paper_id in voted for paper_id in paper_ids}
+
+
+async def build_paper_detail(
     paper: Paper,
-    current_user: Optional[User] = None,
-    db: Optional[Session] = None,
+    current_user: Optional[Principal] = None,
+    db: Optional[AsyncSession] = None,
 ) -> PaperDetail:
     user_has_voted = False
+    vote_count = paper.vote_count
+
+    if db:
+        # buffered votes count as soon as the voted flag shows them
+        vote_count = (await get_vote_counts(db, [paper])).get(
+            paper.id, vote_count
+        )
 
     if current_user and db:
-        vote = db.query(Vote).filter(
-            Vote.paper_id == paper.id,
-            Vote.user_id == current_user.id,
-        ).first()
-        user_has_voted = vote is not None
+        user_has_voted = paper.id in await get_voted_paper_ids(
+            db, current_user.id, [paper.id]
+        )
+
+    content_html = paper.content_html
+    if (
+        content_html is None
+        or paper.content_html_version != RENDERER_VERSION
+    ):
+        # rows left stale by a renderer bump until render_papers.py runs
+        content_html = await run_in_threadpool(
+            render_markdown, paper.content
+        )
 
     return PaperDetail(
         id=paper.id,
@@ -78,105 +171,200 @@ def build_paper_detail(
         slug=paper.slug,
         tags=paper.tags_list,
         author=UserResponse.model_validate(paper.author),
-        vote_count=paper.vote_count,
+        vote_count=vote_count,
         is_published=paper.is_published,
         created_at=paper.created_at,
         published_at=paper.published_at,
         content=paper.content,
-        content_html=render_markdown(paper.content),
+        content_html=content_html,
         user_has_voted=user_has_voted,
     )
 
 
 @router.get("/", response_model=PaperList)
-def list_papers(
+async def list_papers(
     sort: str = Query("recent", enum=["recent", "trending", "top"]),
     tag: Optional[str] = None,
     search: Optional[str] = None,
     pagination: Pagination = Depends(),
-    db: Session = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = db.query(Paper).options(
+    # signed in pages carry voted flags and search terms are too varied to
+    # be worth caching, so only anonymous feed pages are cached
+    if current_user or search:
+        return await build_paper_list(
+            sort, tag, search, pagination, db, current_user
+        )
+
+    cache_key = (
+        sort,
+        normalize_tag(tag) if tag else None,
+        pagination.page,
+        pagination.page_size,
+        pagination.raw_cursor,
+        pagination.include_total,
+    )
+
+    body = feed_cache.get(cache_key)
+    cache_status = "HIT"
+
+    if body is None:
+        generation = feed_cache.generation
+
+        papers = await build_paper_list(sort, tag, search, pagination, db)
+        body = papers.model_dump_json().encode("utf-8")
+        feed_cache.set(cache_key, body, generation)
+        cache_status = "MISS"
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"X-Cache": cache_status},
+    )
+
+
+async def build_paper_list(
+    sort: str,
+    tag: Optional[str],
+    search: Optional[str],
+    pagination: Pagination,
+    db: AsyncSession,
+    current_user: Optional[Principal] = None,
+) -> PaperList:
+    statement = select(Paper).options(
         joinedload(Paper.author)
-    ).filter(Paper.is_published)
+    ).where(Paper.is_published)
 
     if tag:
-        query = query.filter(Paper.tags.contains(tag))
+        statement = statement.join(Paper.tags).where(
+            Tag.name == normalize_tag(tag)
+        )
 
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Paper.title.ilike(search_term)) |
-            (Paper.tags.ilike(search_term))
-        )
+        match = build_match_query(search)
+
+        if match is None:
+            return PaperList(
+                papers=[],
+                total=0,
+                page=pagination.page,
+                page_size=pagination.page_size,
+                total_pages=0,
+            )
 
-    total = query.count()
+        # search results are ranked by relevance rather than by sort
+        statement = apply_search(statement, match)
 
-    if sort == "recent":
-        query = query.order_by(
-            desc(Paper.published_at), desc(Paper.created_at)
+        total = None
+        if pagination.include_total:
+            total = await db.scalar(
+                select(func.count()).select_from(statement.subquery())
+            )
+
+        rows, next_cursor = await pagination.paginate_by_offset(
+            db, statement
         )
-    elif sort == "trending":
-        query = query.order_by(
-            desc(Paper.vote_count),
-            desc(Paper.published_at),
+        voted = await load_voted_flags(
+            db, current_user, [p for p, _ in rows]
         )
-    elif sort == "top":
-        query = query.order_by(
-            desc(Paper.vote_count), desc(Paper.published_at)
+        counts = await get_vote_counts(db, [p for p, _ in rows])
+
+        return PaperList(
+            papers=[
+                build_paper_response(
+                    p,
+                    snippet=format_snippet(snippet),
+                    user_has_voted=voted.get(p.id),
+                    vote_count=counts.get(p.id),
+                )
+                for p, snippet in rows
+            ],
+            total=total,
+            page=pagination.page,
+            page_size=pagination.page_size,
+            total_pages=pagination.total_pages(total),
+            next_cursor=next_cursor,
         )
 
-    papers = query.offset(pagination.offset).limit(pagination.page_size).all()
+    total = None
+    if pagination.include_total:
+        scope = tag_scope(normalize_tag(tag)) if tag else PUBLISHED_SCOPE
+        total = await get_count(db, scope)
 
-    total_pages = (total + pagination.page_size - 1) // pagination.page_size
+    papers, next_cursor = await pagination.paginate(
+        db, statement, SORT_COLUMNS[sort], Paper.id
+    )
+    voted = await load_voted_flags(db, current_user, papers)
+    counts = await get_vote_counts(db, papers)
 
     return PaperList(
-        papers=[build_paper_response(p) for p in papers],
+        papers=[
+            build_paper_response(
+                p, user_has_voted=voted.get(p.id), vote_count=counts.get(p.id)
+            )
+            for p in papers
+        ],
         total=total,
         page=pagination.page,
         page_size=pagination.page_size,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages(total),
+        next_cursor=next_cursor,
     )
 
 
+@router.get("/cache/stats")
+def feed_cache_stats(
+    current_user: Principal = Depends(get_current_admin),
+):
+    return feed_cache.stats()
+
+
 @router.get("/my", response_model=PaperList)
-def list_my_papers(
+async def list_my_papers(
     include_drafts: bool = False,
     pagination: Pagination = Depends(),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = db.query(Paper).options(
+    statement = select(Paper).options(
         joinedload(Paper.author)
-    ).filter(Paper.author_id == current_user.id)
+    ).where(Paper.author_id == current_user.id)
 
     if not include_drafts:
-        query = query.filter(Paper.is_published)
-
-    total = query.count()
+        statement = statement.where(Paper.is_published)
 
-    papers = query.order_by(desc(Paper.created_at)).offset(
-        pagination.offset
-    ).limit(pagination.page_size).all()
+    total = None
+    if pagination.include_total:
+        total = await get_count(
+            db, author_scope(current_user.id, include_drafts=include_drafts)
+        )
 
-    total_pages = (total + pagination.page_size - 1) // pagination.page_size
+    papers, next_cursor = await pagination.paginate(
+        db, statement, Paper.created_at, Paper.id
+    )
+    counts = await get_vote_counts(db, papers)
 
     return PaperList(
-        papers=[build_paper_response(p) for p in papers],
+        papers=[
+            build_paper_response(p, vote_count=counts.get(p.id))
+            for p in papers
+        ],
         total=total,
         page=pagination.page,
         page_size=pagination.page_size,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages(total),
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/user/{username}", response_model=PaperList)
-def list_user_papers(
+async def list_user_papers(
     username: str,
     pagination: Pagination = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
 
     if not user:
         raise HTTPException(
@@ -184,27 +372,32 @@ def list_user_papers(
             detail="user not found",
         )
 
-    query = db.query(Paper).options(
+    statement = select(Paper).options(
         joinedload(Paper.author)
-    ).filter(
+    ).where(
         Paper.author_id == user.id,
         Paper.is_published,
     )
 
-    total = query.count()
-
-    papers = query.order_by(desc(Paper.published_at)).offset(
-        pagination.offset
-    ).limit(pagination.page_size).all()
+    total = None
+    if pagination.include_total:
+        total = await get_count(db, author_scope(user.id))
 
-    total_pages = (total + pagination.page_size - 1) // pagination.page_size
+    papers, next_cursor = await pagination.paginate(
+        db, statement, Paper.published_at, Paper.id
+    )
+    counts = await get_vote_counts(db, papers)
 
     return PaperList(
-        papers=[build_paper_response(p) for p in papers],
+        papers=[
+            build_paper_response(p, vote_count=counts.get(p.id))
+            for p in papers
+        ],
         total=total,
         page=pagination.page,
         page_size=pagination.page_size,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages(total),
+        next_cursor=next_cursor,
     )
 
 
@@ -213,10 +406,11 @@ def list_user_papers(
     response_model=PaperDetail,
     status_code=status.HTTP_201_CREATED
 )
-def create_paper(
+async def create_paper(
     paper_data: PaperCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    writer: AsyncSession = Depends(get_write_db),
 ):
     new_paper = Paper(
         title=paper_data.title,
@@ -226,34 +420,43 @@ def create_paper(
         is_published=paper_data.is_published,
     )
 
-    if paper_data.tags:
-        new_paper.tags_list = paper_data.tags
-
     if paper_data.is_published:
         new_paper.published_at = datetime.now(timezone.utc)
 
-    db.add(new_paper)
-    db.flush()
+    # rendering is cpu bound, so it stays off the event loop. it also runs
+    # before the first write, so the writer is never held across it
+    await run_in_threadpool(render_paper_content, new_paper)
+
+    # set even when empty, so nothing lazy loads the collection later
+    await set_paper_tags_async(writer, new_paper, paper_data.tags or [])
+
+    writer.add(new_paper)
+    await writer.flush()
 
     new_paper.slug = generate_slug(new_paper.title, new_paper.id)
 
-    db.commit()
-    db.refresh(new_paper)
+    await update_counters(writer, removed=[], added=paper_scopes(new_paper))
+    await adjust_user_stats_async(
+        writer, current_user.id, papers=int(new_paper.is_published)
+    )
 
-    update_user_stats(db, current_user.id)
+    await writer.commit()
+    new_paper = await load_paper(db, Paper.id == new_paper.id)
 
-    return build_paper_detail(new_paper, current_user, db)
+    await event_bus.publish_async(
+        PaperCreated(new_paper.id, paper_state(new_paper))
+    )
+
+    return await build_paper_detail(new_paper, current_user, db)
 
 
 @router.get("/{slug}", response_model=PaperDetail)
-def get_paper(
+async def get_paper(
     slug: str,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    paper = db.query(Paper).options(
-        joinedload(Paper.author)
-    ).filter(Paper.slug == slug).first()
+    paper = await load_paper(db, Paper.slug == slug)
 
     if not paper:
         raise HTTPException(
@@ -268,17 +471,18 @@ def get_paper(
                 detail="paper not found",
             )
 
-    return build_paper_detail(paper, current_user, db)
+    return await build_paper_detail(paper, current_user, db)
 
 
 @router.put("/{slug}", response_model=PaperDetail)
-def update_paper(
+async def update_paper(
     slug: str,
     paper_data: PaperUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    writer: AsyncSession = Depends(get_write_db),
 ):
-    paper = db.query(Paper).filter(Paper.slug == slug).first()
+    paper = await load_paper(db, Paper.slug == slug)
 
     if not paper:
         raise HTTPException(
@@ -294,10 +498,29 @@ def update_paper(
 
     update_dict = paper_data.model_dump(exclude_unset=True)
 
+    # rendered on a detached copy before the writer is touched, so its
+    # single connection is never held across the render
+    rendered = Paper(
+        content=update_dict.get("content", paper.content),
+        content_html=paper.content_html,
+        content_hash=paper.content_hash,
+        content_html_version=paper.content_html_version,
+    )
+    await run_in_threadpool(render_paper_content, rendered)
+
+    paper = await load_paper(writer, Paper.id == paper.id)
+
+    if not paper:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="paper not found",
+        )
+
+    scopes = paper_scopes(paper)
+    before = paper_state(paper)
+
     for field, value in update_dict.items():
-        if field == "tags":
-            paper.tags_list = value
-        else:
+        if field != "tags":
             setattr(paper, field, value)
 
     if "title" in update_dict:
@@ -306,19 +529,43 @@ def update_paper(
     if paper_data.is_published and not paper.published_at:
         paper.published_at = datetime.now(timezone.utc)
 
-    db.commit()
-    db.refresh(paper)
+    refresh_trending_score(paper)
 
-    return build_paper_detail(paper, current_user, db)
+    if rendered.content_hash == content_hash(paper.content):
+        paper.content_html = rendered.content_html
+        paper.content_hash = rendered.content_hash
+        paper.content_html_version = rendered.content_html_version
+    else:
+        # the content was edited elsewhere since it was read
+        await run_in_threadpool(render_paper_content, paper)
+
+    if "tags" in update_dict:
+        await set_paper_tags_async(writer, paper, update_dict["tags"])
+
+    await update_counters(writer, removed=scopes, added=paper_scopes(paper))
+    await adjust_user_stats_async(
+        writer,
+        paper.author_id,
+        papers=int(paper.is_published) - int(before.is_published),
+    )
+
+    await writer.commit()
+    paper = await load_paper(db, Paper.id == paper.id)
+
+    await event_bus.publish_async(
+        PaperUpdated(paper.id, before, paper_state(paper))
+    )
+
+    return await build_paper_detail(paper, current_user, db)
 
 
 @router.delete("/{slug}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_paper(
+async def delete_paper(
     slug: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    writer: AsyncSession = Depends(get_write_db),
 ):
-    paper = db.query(Paper).filter(Paper.slug == slug).first()
+    paper = await writer.scalar(select(Paper).where(Paper.slug == slug))
 
     if not paper:
         raise HTTPException(
@@ -332,13 +579,50 @@ def delete_paper(
             detail="not authorized to delete this paper",
         )
 
-    db.delete(paper)
-    db.commit()
+    paper_id = paper.id
+
+    # the vote buffer flushes on a connection of its own, so the count the
+    # stats give back is the one the delete itself removes
+    vote_count = await writer.scalar(
+        delete(Paper)
+        .where(Paper.id == paper_id)
+        .returning(Paper.vote_count)
+        .execution_options(synchronize_session=False)
+    )
+
+    if vote_count is None:
+        await writer.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="paper not found",
+        )
+
+    await writer.execute(
+        delete(Vote)
+        .where(Vote.paper_id == paper_id)
+        .execution_options(synchronize_session=False)
+    )
+    await writer.execute(
+        paper_tags.delete().where(paper_tags.c.paper_id == paper_id)
+    )
+
+    before = paper_state(paper)._replace(vote_count=vote_count)
+
+    await update_counters(writer, removed=paper_scopes(paper), added=[])
+    await adjust_user_stats_async(
+        writer,
+        paper.author_id,
+        papers=-int(paper.is_published),
+        votes=-vote_count,
+    )
+    await writer.commit()
+
+    await event_bus.publish_async(PaperDeleted(paper_id, before))
 
 
 @router.post("/preview", response_model=MarkdownPreviewResponse)
 def preview_markdown(
     preview_data: MarkdownPreview,
 ):
-    html = render_markdown(preview_data.content)
+    html = render_preview(preview_data.content)
     return MarkdownPreviewResponse(html=html)
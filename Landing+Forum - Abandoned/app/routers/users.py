@@ -1,34 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.database import get_db
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_read_db, get_write_db
 from app.dependencies import get_current_user
 
-from app.models import User, Paper
+from app.models import User
+from app.config import settings
 from app.schemas.user import (
-    UserProfile, PublicUserProfile, PasswordChange
+    UserProfile,
+    UserResponse,
+    PublicUserProfile,
+    PasswordChange,
+    LeaderboardEntry,
+    LeaderboardPage,
+    LeaderboardRank,
 )
 
-from app.services.auth import verify_password, get_password_hash
-from app.services.stats import update_user_stats
+from app.services.auth import (
+    get_password_hash_async,
+    verify_password_async,
+)
+from app.services.leaderboard import leaderboard
+from app.services.principals import Principal, revoke_principal
+from app.services.tags import normalize_tag
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.get("/me", response_model=UserProfile)
 async def get_my_profile(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    paper_count = db.query(func.count(Paper.id)).filter(
-        Paper.author_id == current_user.id,
-        Paper.is_published
-    ).scalar()
+    # the principal only carries what authorization needs
+    user = await db.get(User, current_user.id)
 
-    profile = UserProfile.model_validate(current_user)
-    profile.paper_count = paper_count
+    profile = UserProfile.model_validate(user)
+    profile.paper_count = user.papers_count
 
     return profile
 
@@ -36,27 +48,101 @@ async def get_my_profile(
 @router.post("/me/change-password")
 async def change_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    writer: AsyncSession = Depends(get_write_db),
 ):
-    if not verify_password(password_data.current_password, current_user.password):  # noqa
+    user = await db.get(User, current_user.id)
+
+    if not await verify_password_async(
+        password_data.current_password, user.password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password",
         )
 
-    current_user.password = get_password_hash(password_data.new_password)
-    db.commit()
+    # hashing happens before the writer is touched, so it is held only for
+    # the update itself
+    password = await get_password_hash_async(password_data.new_password)
+
+    await writer.execute(
+        update(User).where(User.id == user.id).values(password=password)
+    )
+    revoke_principal(writer, user.id)
+    await writer.commit()
 
     return {"detail": "password changed"}
 
 
+@router.get("/leaderboard", response_model=LeaderboardPage)
+async def get_leaderboard(
+    tag: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=settings.max_page_size),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    tag = normalize_tag(tag) if tag else None
+
+    ranked, total = leaderboard.top(limit, offset, tag=tag)
+
+    users = {
+        user.id: user
+        for user in await db.scalars(
+            select(User).where(
+                User.id.in_([user_id for user_id, _ in ranked])
+            )
+        )
+    }
+
+    return LeaderboardPage(
+        tag=tag,
+        entries=[
+            LeaderboardEntry(
+                rank=offset + position,
+                points=points,
+                user=UserResponse.model_validate(users[user_id]),
+            )
+            for position, (user_id, points) in enumerate(ranked, start=1)
+            if user_id in users
+        ],
+        total=total,
+    )
+
+
+@router.get("/leaderboard/{username}", response_model=LeaderboardRank)
+async def get_leaderboard_rank(
+    username: str,
+    tag: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    user = await db.scalar(select(User).where(User.username == username))
+
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="user not found",
+        )
+
+    tag = normalize_tag(tag) if tag else None
+
+    rank, points, total = leaderboard.rank(user.id, tag=tag)
+
+    return LeaderboardRank(
+        tag=tag,
+        rank=rank,
+        points=points,
+        total=total,
+        user=UserResponse.model_validate(user),
+    )
+
+
 @router.get("/{username}", response_model=PublicUserProfile)
 async def get_user_profile(
     username: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
 
     if not user:
         raise HTTPException(
@@ -70,7 +156,7 @@ async def get_user_profile(
             detail="user not found",
         )
 
-    update_user_stats(db, user.id)
-    db.refresh(user)
+    profile = PublicUserProfile.model_validate(user)
+    profile.paper_count = user.papers_count
 
-    return PublicUserProfile.model_validate(user)
+    return profile
@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_read_db, get_write_db
 from app.dependencies import get_current_user
 
-from app.models import User, Paper, Vote
+from app.models import Paper
 from app.schemas.vote import VoteStatus
 
-from app.services.stats import update_user_stats
+from app.services.events import (
+    VoteCast,
+    VoteRetracted,
+    event_bus,
+    paper_state,
+)
+from app.services.principals import Principal
+from app.services.votes import cast_vote, retract_vote
+from app.services.vote_buffer import get_vote_buffer, get_vote_statuses
 
 router = APIRouter(prefix="/papers/{paper_slug}/vote", tags=["Votes"])
+status_router = APIRouter(prefix="/votes", tags=["Votes"])
+
+MAX_STATUS_SLUGS = 100
 
 
-def get_paper_by_slug(slug: str, db: Session) -> Paper:
-    paper = db.query(Paper).filter(Paper.slug == slug).first()
+async def get_paper_by_slug(slug: str, db: AsyncSession) -> Paper:
+    paper = await db.scalar(select(Paper).where(Paper.slug == slug))
 
     if not paper:
         raise HTTPException(
@@ -32,22 +44,21 @@ def get_paper_by_slug(slug: str, db: Session) -> Paper:
 
 
 @router.get("/", response_model=VoteStatus)
-def get_vote_status(
+async def get_vote_status(
     paper_slug: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    paper = get_paper_by_slug(paper_slug, db)
+    paper = await get_paper_by_slug(paper_slug, db)
 
-    vote = db.query(Vote).filter(
-        Vote.paper_id == paper.id,
-        Vote.user_id == current_user.id,
-    ).first()
+    (_, has_voted, vote_count), = await get_vote_statuses(
+        db, current_user.id, Paper.id == paper.id
+    )
 
     return VoteStatus(
         paper_id=paper.id,
-        has_voted=vote is not None,
-        vote_count=paper.vote_count,
+        has_voted=has_voted,
+        vote_count=vote_count,
     )
 
 
@@ -56,74 +67,100 @@ def get_vote_status(
     response_model=VoteStatus,
     status_code=status.HTTP_201_CREATED
 )
-def upvote_paper(
+async def upvote_paper(
     paper_slug: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    writer: AsyncSession = Depends(get_write_db),
 ):
-    paper = get_paper_by_slug(paper_slug, db)
+    paper = await get_paper_by_slug(paper_slug, db)
 
-    existing_vote = db.query(Vote).filter(
-        Vote.paper_id == paper.id,
-        Vote.user_id == current_user.id,
-    ).first()
+    vote_buffer = get_vote_buffer()
+    if vote_buffer is not None:
+        vote_count = await vote_buffer.cast(db, paper.id, current_user.id)
+    else:
+        vote_count = await cast_vote(writer, paper, current_user.id)
 
-    if existing_vote:
+    if vote_count is None:
+        await writer.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="you have already voted on this paper",
         )
 
-    new_vote = Vote(
-        paper_id=paper.id,
-        user_id=current_user.id,
-    )
-
-    db.add(new_vote)
-    paper.vote_count += 1
-
-    db.commit()
-
-    update_user_stats(db, paper.author_id)
+    # buffered votes reach the feed once their batch is flushed
+    if vote_buffer is None:
+        state = paper_state(paper)
+        await writer.commit()
+        await event_bus.publish_async(
+            VoteCast(paper.id, current_user.id, state)
+        )
 
     return VoteStatus(
         paper_id=paper.id,
         has_voted=True,
-        vote_count=paper.vote_count,
+        vote_count=vote_count,
     )
 
 
 @router.delete("/", response_model=VoteStatus)
-def remove_vote(
+async def remove_vote(
     paper_slug: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    writer: AsyncSession = Depends(get_write_db),
 ):
-    paper = get_paper_by_slug(paper_slug, db)
+    paper = await get_paper_by_slug(paper_slug, db)
 
-    vote = db.query(Vote).filter(
-        Vote.paper_id == paper.id,
-        Vote.user_id == current_user.id,
-    ).first()
+    vote_buffer = get_vote_buffer()
+    if vote_buffer is not None:
+        vote_count = await vote_buffer.retract(db, paper.id, current_user.id)
+    else:
+        vote_count = await retract_vote(writer, paper, current_user.id)
 
-    if not vote:
+    if vote_count is None:
+        await writer.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="you have not voted on this paper",
         )
 
-    db.delete(vote)
-
-    paper.vote_count -= 1
-    if paper.vote_count < 0:
-        paper.vote_count = 0
-
-    db.commit()
-
-    update_user_stats(db, paper.author_id)
+    # buffered votes reach the feed once their batch is flushed
+    if vote_buffer is None:
+        state = paper_state(paper)
+        await writer.commit()
+        await event_bus.publish_async(
+            VoteRetracted(paper.id, current_user.id, state)
+        )
 
     return VoteStatus(
         paper_id=paper.id,
         has_voted=False,
-        vote_count=paper.vote_count,
+        vote_count=vote_count,
     )
+
+
+@status_router.post("/status", response_model=list[VoteStatus])
+async def get_vote_statuses_bulk(
+    slugs: list[str] = Body(..., embed=True, max_length=MAX_STATUS_SLUGS),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if not slugs:
+        return []
+
+    rows = await get_vote_statuses(
+        db,
+        current_user.id,
+        Paper.slug.in_(set(slugs)),
+        Paper.is_published,
+    )
+
+    return [
+        VoteStatus(
+            paper_id=paper_id,
+            has_voted=has_voted,
+            vote_count=vote_count,
+        )
+        for paper_id, has_voted, vote_count in rows
+    ]
@@ -3,6 +3,9 @@ from app.schemas.user import (
     UserResponse,
     UserProfile,
     PublicUserProfile,
+    LeaderboardEntry,
+    LeaderboardPage,
+    LeaderboardRank,
     Token,
     TokenData,
     PasswordChange,
@@ -28,6 +31,9 @@ __all__ = [
     "UserResponse",
     "UserProfile",
     "PublicUserProfile",
+    "LeaderboardEntry",
+    "LeaderboardPage",
+    "LeaderboardRank",
     "Token",
     "TokenData",
     "PasswordChange",
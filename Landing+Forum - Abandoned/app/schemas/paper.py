@@ -49,6 +49,11 @@ class PaperResponse(BaseModel):
     created_at: datetime
     published_at: Optional[datetime] = None
 
+    snippet: Optional[str] = None
+
+    # only filled in for signed in readers
+    user_has_voted: Optional[bool] = None
+
 
 class PaperDetail(PaperResponse):
     content: str
@@ -59,10 +64,12 @@ class PaperDetail(PaperResponse):
 class PaperList(BaseModel):
     papers: list[PaperResponse]
 
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+
+    next_cursor: Optional[str] = None
 
 
 class MarkdownPreview(BaseModel):
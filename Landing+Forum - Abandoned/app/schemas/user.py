@@ -58,6 +58,26 @@ class PublicUserProfile(BaseModel):
     reputation_points: int = 0
 
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    points: int
+
+    user: UserResponse
+
+
+class LeaderboardPage(BaseModel):
+    tag: Optional[str] = None
+
+    entries: list[LeaderboardEntry]
+    total: int
+
+
+class LeaderboardRank(LeaderboardEntry):
+    tag: Optional[str] = None
+
+    total: int
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -1,16 +1,27 @@
 from app.services.auth import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
     decode_access_token,
 )
-from app.services.markdown import render_markdown, sanitize_html
+from app.services.markdown import (
+    render_markdown,
+    render_paper_content,
+    sanitize_html,
+)
+from app.services.preview import render_preview
 
 __all__ = [
     "verify_password",
     "get_password_hash",
+    "verify_password_async",
+    "get_password_hash_async",
     "create_access_token",
     "decode_access_token",
     "render_markdown",
+    "render_paper_content",
     "sanitize_html",
+    "render_preview",
 ]
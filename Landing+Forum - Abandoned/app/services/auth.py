@@ -1,5 +1,12 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Callable, Optional
 import bcrypt
 from jose import JWTError, jwt
 
@@ -7,14 +14,123 @@ from app.config import settings
 from app.schemas.user import TokenData
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# bcrypt releases the gil while hashing, so threads use every core
+PASSWORD_HASH_WORKERS = min(4, os.cpu_count() or 1)
+PASSWORD_HASH_MAX_PENDING = 64
+PASSWORD_HASH_SAMPLES = 1024
+
+TOKEN_CACHE_SIZE = 10000
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+        self._wait_times: deque[float] = deque(maxlen=PASSWORD_HASH_SAMPLES)
+        self._hash_times: deque[float] = deque(maxlen=PASSWORD_HASH_SAMPLES)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            # failing fast beats queueing logins behind seconds of hashing
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+
+            self.pending += 1
+
+        try:
+            return self._executor.submit(
+                self._timed, fn, time.perf_counter(), *args
+            )
+        except RuntimeError:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+    def run(self, fn: Callable, *args):
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_ms": _percentiles(self._wait_times),
+                "hash_ms": _percentiles(self._hash_times),
+            }
+
+    def _timed(self, fn: Callable, queued_at: float, *args):
+        started_at = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished_at = time.perf_counter()
+
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self._wait_times.append(started_at - queued_at)
+                self._hash_times.append(finished_at - started_at)
+
+
+def _percentiles(samples: deque[float]) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+
+    ordered = sorted(samples)
+
+    def at(fraction: float) -> float:
+        index = min(int(len(ordered) * fraction), len(ordered) - 1)
+        return round(ordered[index] * 1000, 2)
+
+    return {"p50": at(0.5), "p95": at(0.95), "max": at(1.0)}
+
+
+password_hasher = PasswordHasher()
+
+
+def _check_password(plain_password: str, hashed_password: str) -> bool:
     password_bytes = plain_password.encode('utf-8')
     hashed_bytes = hashed_password.encode('utf-8')
 
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
-def get_password_hash(password: str) -> str:
+def _hash_password(password: str) -> str:
     password_bytes = password.encode('utf-8')
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password_bytes, salt)
@@ -22,6 +138,109 @@ def get_password_hash(password: str) -> str:
     return hashed.decode('utf-8')
 
 
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return password_hasher.run(
+        _check_password, plain_password, hashed_password
+    )
+
+
+def get_password_hash(password: str) -> str:
+    return password_hasher.run(_hash_password, password)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> bool:
+    return await password_hasher.run_async(
+        _check_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run_async(_hash_password, password)
+
+
+class TokenCache:
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # keyed by digest so raw bearer tokens are never held in memory
+        self._entries: OrderedDict[bytes, tuple[float, TokenData]] = (
+            OrderedDict()
+        )
+        self._by_user: defaultdict[int, set[bytes]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, digest: bytes) -> Optional[TokenData]:
+        with self._lock:
+            entry = self._entries.get(digest)
+
+            if entry is not None:
+                expires_at, token_data = entry
+
+                if expires_at > time.time():
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return token_data
+
+                self._remove(digest)
+
+            self.misses += 1
+            return None
+
+    def set(
+        self, digest: bytes, token_data: TokenData, expires_at: float
+    ) -> None:
+        with self._lock:
+            if digest in self._entries:
+                self._remove(digest)
+
+            self._entries[digest] = (expires_at, token_data)
+            self._by_user[token_data.user_id].add(digest)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def purge_user(self, user_id: int) -> None:
+        with self._lock:
+            for digest in list(self._by_user.get(user_id, ())):
+                self._remove(digest)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, digest: bytes) -> None:
+        _, token_data = self._entries.pop(digest)
+
+        digests = self._by_user[token_data.user_id]
+        digests.discard(digest)
+        if not digests:
+            del self._by_user[token_data.user_id]
+
+
+token_cache = TokenCache()
+
+
 def create_access_token(
     data: dict, expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -46,6 +265,12 @@ def create_access_token(
 
 
 def decode_access_token(token: str) -> Optional[TokenData]:
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+
+    token_data = token_cache.get(digest)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(
             token,
@@ -59,7 +284,13 @@ def decode_access_token(token: str) -> Optional[TokenData]:
         if user_id is None:
             return None
 
-        return TokenData(user_id=user_id, username=username)
+        token_data = TokenData(user_id=user_id, username=username)
+
+        # jwt.decode has already checked exp, so it is a valid timestamp
+        if payload.get("exp") is not None:
+            token_cache.set(digest, token_data, float(payload["exp"]))
+
+        return token_data
 
     except JWTError:
         return None
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+FEED_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# every worker keeps its own cache and only sees its own writes, so entries
+# also expire after this many seconds to bound staleness across workers
+FEED_CACHE_TTL = 30.0
+
+
+class FeedCache:
+    def __init__(
+        self,
+        max_bytes: int = FEED_CACHE_MAX_BYTES,
+        ttl: float = FEED_CACHE_TTL,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.generation = 0
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[tuple, tuple[int, float, bytes]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                generation, expires_at, body = entry
+
+                if (
+                    generation == self.generation
+                    and expires_at > time.monotonic()
+                ):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+
+                self._remove(key)
+
+            self.misses += 1
+            return None
+
+    def set(self, key: tuple, body: bytes, generation: int) -> None:
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            # a write that landed while the page was being built makes it
+            # stale before it is even stored
+            if generation != self.generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (
+                generation, time.monotonic() + self.ttl, body
+            )
+            self.size += len(body)
+
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        # old entries are dropped lazily on lookup or pushed out by the lru
+        with self._lock:
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "generation": self.generation,
+                "entries": len(self._entries),
+                "size_bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key: tuple) -> None:
+        _, _, body = self._entries.pop(key)
+        self.size -= len(body)
+
+
+feed_cache = FeedCache()
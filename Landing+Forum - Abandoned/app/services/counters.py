@@ -0,0 +1,129 @@
+from collections import Counter as Deltas
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Counter, Paper, Tag, paper_tags
+
+
+PUBLISHED_SCOPE = "papers:published"
+
+
+def author_scope(author_id: int, include_drafts: bool = False) -> str:
+    kind = "all" if include_drafts else "published"
+    return f"papers:author:{author_id}:{kind}"
+
+
+def tag_scope(tag: str) -> str:
+    return f"papers:tag:{tag}:published"
+
+
+def paper_scopes(paper: Paper) -> list[str]:
+    scopes = [author_scope(paper.author_id, include_drafts=True)]
+
+    if paper.is_published:
+        scopes.append(PUBLISHED_SCOPE)
+        scopes.append(author_scope(paper.author_id))
+        scopes.extend(tag_scope(tag.name) for tag in paper.tags)
+
+    return scopes
+
+
+async def update_counters(
+    db: AsyncSession, removed: list[str], added: list[str]
+) -> None:
+    deltas = Deltas(added)
+    deltas.subtract(removed)
+
+    changes = [
+        {"scope": scope, "value": delta}
+        for scope, delta in deltas.items()
+        if delta
+    ]
+    if not changes:
+        return
+
+    # runs inside the caller's transaction, so the counts commit or roll
+    # back together with the paper change
+    statement = insert(Counter)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[Counter.scope],
+            set_={"value": Counter.value + statement.excluded.value},
+        ),
+        changes,
+    )
+
+    # a missing row reads as 0, so scopes that empty out are dropped rather
+    # than kept for every tag that was ever used
+    decremented = [scope for scope, delta in deltas.items() if delta < 0]
+    if decremented:
+        await db.execute(
+            delete(Counter).where(
+                Counter.scope.in_(decremented), Counter.value == 0
+            )
+        )
+
+
+async def get_count(db: AsyncSession, scope: str) -> int:
+    value = await db.scalar(
+        select(Counter.value).where(Counter.scope == scope)
+    )
+    return value or 0
+
+
+def count_scopes(db: Session) -> dict[str, int]:
+    counts = {
+        PUBLISHED_SCOPE: db.query(func.count(Paper.id)).filter(
+            Paper.is_published
+        ).scalar() or 0,
+    }
+
+    rows = db.query(
+        Paper.author_id, Paper.is_published, func.count(Paper.id)
+    ).group_by(Paper.author_id, Paper.is_published)
+
+    for author_id, is_published, count in rows:
+        drafts_scope = author_scope(author_id, include_drafts=True)
+        counts[drafts_scope] = counts.get(drafts_scope, 0) + count
+
+        if is_published:
+            counts[author_scope(author_id)] = count
+
+    rows = db.query(Tag.name, func.count(Paper.id)).join(
+        paper_tags, paper_tags.c.tag_id == Tag.id
+    ).join(
+        Paper, Paper.id == paper_tags.c.paper_id
+    ).filter(Paper.is_published).group_by(Tag.name)
+
+    for name, count in rows:
+        counts[tag_scope(name)] = count
+
+    return counts
+
+
+def reconcile_counters(db: Session) -> dict[str, tuple[int, int]]:
+    stored = dict(db.query(Counter.scope, Counter.value))
+
+    # clearing the table first takes the write lock, so no paper change can
+    # land between counting and storing the counts
+    db.query(Counter).delete(synchronize_session=False)
+
+    expected = count_scopes(db)
+    db.add_all(
+        Counter(scope=scope, value=value)
+        for scope, value in expected.items()
+        if value
+    )
+
+    drift = {}
+    for scope in expected.keys() | stored.keys():
+        stored_value = stored.get(scope, 0)
+        expected_value = expected.get(scope, 0)
+
+        if stored_value != expected_value:
+            drift[scope] = (stored_value, expected_value)
+
+    return drift
@@ -0,0 +1,212 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.models import Paper
+
+
+EVENT_QUEUE_SIZE = 10000
+EVENT_BATCH_SIZE = 200
+EVENT_BATCH_WAIT = 0.02
+
+logger = logging.getLogger(__name__)
+
+
+class PaperState(NamedTuple):
+    author_id: int
+    is_published: bool
+    vote_count: int
+    tags: tuple[str, ...]
+
+
+def paper_state(paper: Paper) -> PaperState:
+    return PaperState(
+        author_id=paper.author_id,
+        is_published=bool(paper.is_published),
+        vote_count=paper.vote_count or 0,
+        tags=tuple(paper.tags_list),
+    )
+
+
+@dataclass(frozen=True)
+class PaperCreated:
+    paper_id: int
+    paper: PaperState
+
+
+@dataclass(frozen=True)
+class PaperUpdated:
+    paper_id: int
+    before: PaperState
+    after: PaperState
+
+
+@dataclass(frozen=True)
+class PaperDeleted:
+    paper_id: int
+    paper: PaperState
+
+
+@dataclass(frozen=True)
+class VoteCast:
+    paper_id: int
+    user_id: int
+    paper: PaperState
+
+
+@dataclass(frozen=True)
+class VoteRetracted:
+    paper_id: int
+    user_id: int
+    paper: PaperState
+
+
+@dataclass(frozen=True)
+class UserRegistered:
+    user_id: int
+
+
+Handler = Callable[[list], None]
+
+_STOP = object()
+
+
+class EventBus:
+    def __init__(
+        self,
+        max_size: int = EVENT_QUEUE_SIZE,
+        batch_size: int = EVENT_BATCH_SIZE,
+        batch_wait: float = EVENT_BATCH_WAIT,
+    ):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+
+        self.published = 0
+        self.handled = 0
+        self.failures = 0
+
+        self._handlers: defaultdict[type, list[Handler]] = defaultdict(list)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, handler: Handler, *event_types: type) -> None:
+        for event_type in event_types:
+            if handler not in self._handlers[event_type]:
+                self._handlers[event_type].append(handler)
+
+    def publish(self, *events) -> None:
+        # without a running worker, as in scripts, events are handled inline
+        if self._thread is None:
+            self._dispatch(list(events))
+            return
+
+        # a full queue blocks the publisher, which slows writers down to the
+        # pace the subscribers can keep up with
+        for event in events:
+            self._queue.put(event)
+            self.published += 1
+
+    async def publish_async(self, *events) -> None:
+        # the event loop must never block on a full queue, only the request
+        # publishing waits, on a worker thread
+        if self._thread is None:
+            await run_in_threadpool(self._dispatch, list(events))
+            return
+
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                await run_in_threadpool(self._queue.put, event)
+            self.published += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="event-bus", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def wait_idle(self) -> None:
+        self._queue.join()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "published": self.published,
+            "handled": self.handled,
+            "failures": self.failures,
+        }
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_wait
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            stopping = _STOP in batch
+            events = [event for event in batch if event is not _STOP]
+
+            # the queue is drained before stopping so nothing is lost on a
+            # clean shutdown
+            if stopping:
+                while True:
+                    try:
+                        event = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(event)
+                    events.append(event)
+
+            self._dispatch(events)
+
+            for _ in batch:
+                self._queue.task_done()
+
+            if stopping:
+                return
+
+    def _dispatch(self, events: list) -> None:
+        batches: dict[Handler, list] = {}
+
+        for event in events:
+            for handler in self._handlers.get(type(event), []):
+                batches.setdefault(handler, []).append(event)
+
+        for handler, batch in batches.items():
+            try:
+                handler(batch)
+            except Exception:
+                self.failures += 1
+                logger.exception(
+                    "event handler %s failed on %d events",
+                    getattr(handler, "__name__", handler),
+                    len(batch),
+                )
+
+        self.handled += len(events)
+
+
+event_bus = EventBus()
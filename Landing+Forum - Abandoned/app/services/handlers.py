@@ -0,0 +1,45 @@
+from app.database import SessionLocal
+from app.services.cache import feed_cache
+from app.services.events import (
+    EventBus,
+    PaperCreated,
+    PaperDeleted,
+    PaperUpdated,
+    UserRegistered,
+    VoteCast,
+    VoteRetracted,
+)
+from app.services.leaderboard import leaderboard
+from app.services.search import reindex_papers
+
+
+PAPER_EVENTS = (PaperCreated, PaperUpdated, PaperDeleted)
+VOTE_EVENTS = (VoteCast, VoteRetracted)
+
+
+def invalidate_feed(events: list) -> None:
+    feed_cache.invalidate()
+
+
+def update_search_index(events: list) -> None:
+    # a paper edited several times in one batch is indexed once, from
+    # whatever is committed by now
+    paper_ids = list(dict.fromkeys(event.paper_id for event in events))
+
+    db = SessionLocal()
+    try:
+        reindex_papers(db, paper_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def register_handlers(bus: EventBus) -> None:
+    bus.subscribe(invalidate_feed, *PAPER_EVENTS, *VOTE_EVENTS)
+    bus.subscribe(update_search_index, *PAPER_EVENTS)
+    bus.subscribe(
+        leaderboard.handle, *PAPER_EVENTS, *VOTE_EVENTS, UserRegistered
+    )
@@ -0,0 +1,264 @@
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from functools import partial
+from typing import Callable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import User, Paper, Tag, paper_tags
+from app.services.events import (
+    PaperCreated,
+    PaperDeleted,
+    PaperState,
+    PaperUpdated,
+    UserRegistered,
+    VoteCast,
+    VoteRetracted,
+)
+from app.services.stats import REPUTATION_PER_PAPER, REPUTATION_PER_VOTE
+
+
+LEADERBOARD_REBUILD_INTERVAL = 300
+
+
+def reputation_points(state: Optional[PaperState]) -> int:
+    # mirrors users.reputation_points: votes count even on drafts
+    if state is None:
+        return 0
+
+    return (
+        int(state.is_published) * REPUTATION_PER_PAPER
+        + state.vote_count * REPUTATION_PER_VOTE
+    )
+
+
+def tag_points(state: Optional[PaperState]) -> int:
+    # tag rankings only credit what readers can see under the tag
+    if state is None or not state.is_published:
+        return 0
+
+    return REPUTATION_PER_PAPER + state.vote_count * REPUTATION_PER_VOTE
+
+
+def load_paper_states(
+    db: Session, paper_ids: list[int]
+) -> dict[int, PaperState]:
+    if not paper_ids:
+        return {}
+
+    tags: defaultdict[int, list[str]] = defaultdict(list)
+
+    rows = db.query(paper_tags.c.paper_id, Tag.name).join(
+        Tag, Tag.id == paper_tags.c.tag_id
+    ).filter(
+        paper_tags.c.paper_id.in_(paper_ids)
+    ).order_by(Tag.name)
+
+    for paper_id, name in rows:
+        tags[paper_id].append(name)
+
+    rows = db.query(
+        Paper.id, Paper.author_id, Paper.is_published, Paper.vote_count
+    ).filter(Paper.id.in_(paper_ids))
+
+    return {
+        paper_id: PaperState(
+            author_id=author_id,
+            is_published=bool(is_published),
+            vote_count=vote_count,
+            tags=tuple(tags[paper_id]),
+        )
+        for paper_id, author_id, is_published, vote_count in rows
+    }
+
+
+class Ranking:
+    def __init__(self, scores: Optional[dict[int, int]] = None):
+        self.scores: dict[int, int] = dict(scores or {})
+
+        # ordered best first, ties broken by the older account
+        self._keys = sorted(
+            (-score, user_id) for user_id, score in self.scores.items()
+        )
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, user_id: int, points: int) -> None:
+        old = self.scores.get(user_id)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+
+        score = (old or 0) + points
+        self.scores[user_id] = score
+        insort(self._keys, (-score, user_id))
+
+    def top(self, limit: int, offset: int = 0) -> list[tuple[int, int]]:
+        return [
+            (user_id, -score)
+            for score, user_id in self._keys[offset:offset + limit]
+        ]
+
+    def rank(self, user_id: int) -> tuple[int, int]:
+        score = self.scores.get(user_id, 0)
+        return bisect_left(self._keys, (-score, user_id)) + 1, score
+
+
+class Leaderboard:
+    def __init__(self):
+        self._global = Ranking()
+        self._tags: dict[str, Ranking] = {}
+        self._lock = threading.Lock()
+
+        # changes handled while a rebuild reads the database are replayed
+        # onto the rebuilt rankings. one the read already saw then counts
+        # twice until the next rebuild, which beats losing the rest
+        self._missed: Optional[list[Callable[[], None]]] = None
+
+    def rebuild(self, db: Session) -> None:
+        with self._lock:
+            self._missed = []
+
+        try:
+            ranking, rankings = self._load(db)
+        except Exception:
+            with self._lock:
+                self._missed = None
+            raise
+
+        # built off to the side so readers never wait on a rebuild
+        with self._lock:
+            self._global = ranking
+            self._tags = rankings
+
+            missed, self._missed = self._missed, None
+            for apply in missed:
+                apply()
+
+    def add_user(self, user_id: int) -> None:
+        with self._lock:
+            self._add_user(user_id)
+
+            if self._missed is not None:
+                self._missed.append(partial(self._add_user, user_id))
+
+    def update_paper(
+        self, before: Optional[PaperState], after: Optional[PaperState]
+    ) -> None:
+        with self._lock:
+            self._update_paper(before, after)
+
+            if self._missed is not None:
+                self._missed.append(
+                    partial(self._update_paper, before, after)
+                )
+
+    def record_vote(self, state: PaperState, delta: int) -> None:
+        self.update_paper(
+            state, state._replace(vote_count=state.vote_count + delta)
+        )
+
+    def handle(self, events: list) -> None:
+        for event in events:
+            if isinstance(event, PaperCreated):
+                self.update_paper(None, event.paper)
+            elif isinstance(event, PaperUpdated):
+                self.update_paper(event.before, event.after)
+            elif isinstance(event, PaperDeleted):
+                self.update_paper(event.paper, None)
+            elif isinstance(event, VoteCast):
+                self.record_vote(event.paper, 1)
+            elif isinstance(event, VoteRetracted):
+                self.record_vote(event.paper, -1)
+            elif isinstance(event, UserRegistered):
+                self.add_user(event.user_id)
+
+    def top(
+        self, limit: int, offset: int = 0, tag: Optional[str] = None
+    ) -> tuple[list[tuple[int, int]], int]:
+        with self._lock:
+            ranking = self._ranking(tag)
+            return ranking.top(limit, offset), len(ranking)
+
+    def rank(
+        self, user_id: int, tag: Optional[str] = None
+    ) -> tuple[int, int, int]:
+        with self._lock:
+            ranking = self._ranking(tag)
+            position, score = ranking.rank(user_id)
+            return position, score, len(ranking)
+
+    def _ranking(self, tag: Optional[str]) -> Ranking:
+        if tag is None:
+            return self._global
+
+        return self._tags.get(tag) or Ranking()
+
+    def _load(self, db: Session) -> tuple[Ranking, dict[str, Ranking]]:
+        scores = dict(
+            db.query(User.id, User.reputation_points).filter(User.is_active)
+        )
+
+        tag_scores: defaultdict[str, dict[int, int]] = defaultdict(dict)
+
+        rows = db.query(
+            Tag.name,
+            Paper.author_id,
+            func.count(Paper.id),
+            func.sum(Paper.vote_count),
+        ).join(
+            paper_tags, paper_tags.c.tag_id == Tag.id
+        ).join(
+            Paper, Paper.id == paper_tags.c.paper_id
+        ).filter(
+            Paper.is_published
+        ).group_by(Tag.name, Paper.author_id)
+
+        for name, author_id, papers, votes in rows:
+            tag_scores[name][author_id] = (
+                papers * REPUTATION_PER_PAPER
+                + (votes or 0) * REPUTATION_PER_VOTE
+            )
+
+        ranking = Ranking(scores)
+        rankings = {
+            name: Ranking(scores) for name, scores in tag_scores.items()
+        }
+
+        return ranking, rankings
+
+    def _add_user(self, user_id: int) -> None:
+        if user_id not in self._global.scores:
+            self._global.add(user_id, 0)
+
+    def _update_paper(
+        self, before: Optional[PaperState], after: Optional[PaperState]
+    ) -> None:
+        state = after or before
+        if state is None:
+            return
+
+        points = reputation_points(after) - reputation_points(before)
+        if points:
+            self._global.add(state.author_id, points)
+
+        if before is not None:
+            self._add_tag_points(before, -tag_points(before))
+        if after is not None:
+            self._add_tag_points(after, tag_points(after))
+
+    def _add_tag_points(self, state: PaperState, points: int) -> None:
+        if not points:
+            return
+
+        for tag in state.tags:
+            ranking = self._tags.get(tag)
+            if ranking is None:
+                ranking = self._tags[tag] = Ranking()
+
+            ranking.add(state.author_id, points)
+
+
+leaderboard = Leaderboard()
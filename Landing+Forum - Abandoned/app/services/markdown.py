@@ -1,7 +1,16 @@
+import hashlib
+import threading
+from functools import partial
+from xml.sax.saxutils import escape
+
 import markdown
 
-import bleach
+from bleach import html5lib_shim
 from bleach.css_sanitizer import CSSSanitizer
+from bleach.linkifier import LinkifyFilter
+from bleach.sanitizer import Cleaner
+
+from app.services.metrics import MARKDOWN_RENDER
 
 
 ALLOWED_TAGS = [
@@ -60,45 +69,130 @@ MARKDOWN_EXTENSION_CONFIGS = {
     },
 }
 
-md = markdown.Markdown(
-    extensions=MARKDOWN_EXTENSIONS,
-    extension_configs=MARKDOWN_EXTENSION_CONFIGS,
-)
+# bump whenever the pipeline or allowlists change so stored html is re-rendered
+RENDERER_VERSION = 2
+
+# markdown.Markdown and bleach's Cleaner keep parser state between calls, so
+# sync routes running in the threadpool each get their own instances
+_local = threading.local()
+
+
+def get_markdown() -> markdown.Markdown:
+    md = getattr(_local, "md", None)
+
+    if md is None:
+        md = markdown.Markdown(
+            extensions=MARKDOWN_EXTENSIONS,
+            extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+        )
+        _local.md = md
+
+    return md
+
+
+LINKIFY_SKIP_TAGS = ["pre", "code"]
+
+
+class _EscapedTextFilter(html5lib_shim.Filter):
+    # linkify used to run on the serialized output of clean, where entities
+    # are still written out in the text. it is handed the text in that form
+    # so urls next to entities end where they did. pre and code are not
+    # linkified and keep their tokens
+    def __iter__(self):
+        skip_tag = None
+        text = []
+
+        for token in super().__iter__():
+            if skip_tag is None:
+                if token["type"] in ("Characters", "SpaceCharacters"):
+                    text.append(escape(token["data"]))
+                    continue
+
+                if token["type"] == "Entity":
+                    text.append(f"&{token['name']};")
+                    continue
+
+            if text:
+                yield {"type": "Characters", "data": "".join(text)}
+                text = []
+
+            if token["type"] == "StartTag" and skip_tag is None:
+                if token["name"] in LINKIFY_SKIP_TAGS:
+                    skip_tag = token["name"]
+            elif token["type"] == "EndTag" and token["name"] == skip_tag:
+                skip_tag = None
+
+            yield token
+
+        if text:
+            yield {"type": "Characters", "data": "".join(text)}
+
+
+def get_cleaner() -> Cleaner:
+    cleaner = getattr(_local, "cleaner", None)
+
+    if cleaner is None:
+        # linkify runs as a filter on the sanitized token stream, so the
+        # html is parsed and serialized once instead of once per pass
+        cleaner = Cleaner(
+            tags=ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            protocols=ALLOWED_PROTOCOLS,
+            css_sanitizer=css_sanitizer,
+            strip=True,
+            filters=[
+                _EscapedTextFilter,
+                partial(
+                    LinkifyFilter,
+                    callbacks=[_set_link_attributes],
+                    skip_tags=LINKIFY_SKIP_TAGS,
+                    parse_email=False,
+                ),
+            ],
+        )
+        _local.cleaner = cleaner
+
+    return cleaner
 
 
 def render_markdown(content: str) -> str:
     if not content:
         return ""
 
-    md.reset()
+    with MARKDOWN_RENDER.time():
+        md = get_markdown()
+        md.reset()
 
-    html = md.convert(content)
-    sanitized = sanitize_html(html)
+        html = md.convert(content)
+        sanitized = sanitize_html(html)
 
     return sanitized
 
 
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def render_paper_content(paper) -> None:
+    digest = content_hash(paper.content)
+
+    if (
+        paper.content_html is not None
+        and paper.content_hash == digest
+        and paper.content_html_version == RENDERER_VERSION
+    ):
+        return
+
+    paper.content_html = render_markdown(paper.content)
+    paper.content_hash = digest
+    paper.content_html_version = RENDERER_VERSION
+
+
 def sanitize_html(html: str) -> str:
     if not html:
         return ""
 
-    clean_html = bleach.clean(
-        html,
-        tags=ALLOWED_TAGS,
-        attributes=ALLOWED_ATTRIBUTES,
-        protocols=ALLOWED_PROTOCOLS,
-        css_sanitizer=css_sanitizer,
-        strip=True,
-    )
-
-    clean_html = bleach.linkify(
-        clean_html,
-        callbacks=[_set_link_attributes],
-        skip_tags=["pre", "code"],
-        parse_email=False,
-    )
-
-    return clean_html
+    return get_cleaner().clean(html)
 
 
 def _set_link_attributes(attrs, new=False):
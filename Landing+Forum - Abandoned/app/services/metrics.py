@@ -0,0 +1,156 @@
+import os
+import time
+from typing import Optional
+
+from anyio.to_thread import current_default_thread_limiter
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.engine import Engine
+
+
+# with several workers each process writes its samples to files in this
+# directory, and a scrape of any one worker merges all of them. it has to
+# be set before the process starts, prometheus_client reads it on import
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+REQUEST_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+WAIT_BUCKETS = (
+    0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests served, by route and status",
+    ["method", "route", "status"],
+)
+REQUEST_ERRORS = Counter(
+    "http_request_errors_total",
+    "Requests that failed with a server error",
+    ["method", "route"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response is ready",
+    ["method", "route"],
+    buckets=REQUEST_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled right now",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+THREADPOOL_THREADS = Gauge(
+    "threadpool_threads",
+    "Threads a pool may run at once",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_threads_busy",
+    "Threads of a pool running a task",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_tasks_waiting",
+    "Tasks queued for a free thread",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+DB_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["engine"],
+    buckets=WAIT_BUCKETS,
+)
+
+MARKDOWN_RENDER = Histogram(
+    "markdown_render_seconds",
+    "Time spent rendering and sanitizing markdown",
+    buckets=REQUEST_BUCKETS,
+)
+
+
+def route_label(route_path: Optional[str]) -> str:
+    # unmatched paths are not used as labels, every probe for a missing
+    # url would otherwise start a new series
+    return route_path or UNMATCHED_ROUTE
+
+
+def observe_request(
+    method: str, route_path: Optional[str], status: int, duration: float
+) -> None:
+    label = route_label(route_path)
+
+    REQUESTS.labels(method, label, str(status)).inc()
+    REQUEST_LATENCY.labels(method, label).observe(duration)
+
+    if status >= 500:
+        REQUEST_ERRORS.labels(method, label).inc()
+
+
+def observe_threadpools(hasher_workers: int, hasher_pending: int) -> None:
+    # sampled on every request rather than on scrape, a scrape only reaches
+    # one of the workers
+    statistics = current_default_thread_limiter().statistics()
+
+    THREADPOOL_THREADS.labels("anyio").set(statistics.total_tokens)
+    THREADPOOL_BUSY.labels("anyio").set(statistics.borrowed_tokens)
+    THREADPOOL_WAITING.labels("anyio").set(statistics.tasks_waiting)
+
+    THREADPOOL_THREADS.labels("bcrypt").set(hasher_workers)
+    THREADPOOL_BUSY.labels("bcrypt").set(
+        min(hasher_pending, hasher_workers)
+    )
+    THREADPOOL_WAITING.labels("bcrypt").set(
+        max(hasher_pending - hasher_workers, 0)
+    )
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    # the pool has no event for a checkout that has started but not yet got
+    # a connection, so the checkout call itself is timed. it is wrapped on
+    # the engine, dispose() swaps the pool out
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            DB_CHECKOUT_WAIT.labels(name).observe(
+                time.perf_counter() - started
+            )
+
+    engine.raw_connection = timed_raw_connection
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    # drops this worker's live gauges from the merged view
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,185 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from markdown.extensions.toc import unique
+
+from app.services.markdown import RENDERER_VERSION, render_markdown
+
+
+PREVIEW_CACHE_SIZE = 4096
+
+_FENCE_RE = re.compile(r"^(`{3,}|~{3,})")
+_LIST_ITEM_RE = re.compile(r"^ {0,3}([*+-]|\d+\.)[ \t]")
+_BLOCKQUOTE_RE = re.compile(r"^ {0,3}>")
+
+# constructs that depend on the whole document: reference link definitions,
+# the toc marker and raw html blocks. documents using them are rendered whole
+_DOCUMENT_SCOPED_RE = re.compile(
+    r"^ {0,3}(\[[^\]]+\]:|\[TOC\]\s*$|<[A-Za-z/!?])"
+)
+
+_HEADING_ID_RE = re.compile(r'<h[1-6] id="([^"]*)"')
+
+# rendered after every block so the separator python-markdown would emit
+# before the next sibling is kept as part of the cached fragment
+_BLOCK_END = "arkhanpreviewblockend"
+_BLOCK_END_HTML = f"<p>{_BLOCK_END}</p>"
+
+
+class BlockCache:
+    def __init__(self, max_entries: int = PREVIEW_CACHE_SIZE):
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[str, tuple[str, frozenset]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple[str, frozenset]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: tuple[str, frozenset]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+block_cache = BlockCache()
+
+
+def _is_blank(line: str) -> bool:
+    return not line.strip()
+
+
+def _continues_previous(line: str) -> bool:
+    # indented lines continue list items and code blocks, and python-markdown
+    # folds consecutive lists and blockquotes into the previous sibling
+    return (
+        line[0] in " \t"
+        or _LIST_ITEM_RE.match(line) is not None
+        or _BLOCKQUOTE_RE.match(line) is not None
+    )
+
+
+def split_blocks(content: str) -> Optional[list[str]]:
+    lines = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+    # python-markdown only drops whitespace-only lines after a newline, so a
+    # leading one turns into an empty code block
+    if lines[0] and _is_blank(lines[0]):
+        return None
+
+    blocks: list[list[str]] = []
+    current: list[str] = []
+    blank_run: list[str] = []
+    fence: Optional[str] = None
+
+    for line in lines:
+        if fence is not None:
+            current.extend(blank_run)
+            blank_run = []
+            current.append(line)
+
+            if line.rstrip(" ") == fence:
+                fence = None
+            continue
+
+        if _is_blank(line):
+            if current:
+                blank_run.append(line)
+            continue
+
+        if _DOCUMENT_SCOPED_RE.match(line):
+            return None
+
+        if blank_run:
+            if _continues_previous(line):
+                current.extend(blank_run)
+            else:
+                blocks.append(current)
+                current = []
+            blank_run = []
+
+        current.append(line)
+
+        match = _FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+
+    if current:
+        blocks.append(current)
+
+    return ["\n".join(block) for block in blocks]
+
+
+def _render_block(block: str) -> Optional[tuple[str, frozenset]]:
+    key = hashlib.sha256(
+        f"{RENDERER_VERSION}:{block}".encode("utf-8")
+    ).hexdigest()
+
+    entry = block_cache.get(key)
+    if entry is None:
+        html = render_markdown(f"{block}\n\n{_BLOCK_END}")
+
+        end = html.rfind(_BLOCK_END_HTML)
+        if end == -1:
+            return None
+
+        html = html[:end]
+        entry = (html, frozenset(_HEADING_ID_RE.findall(html)))
+        block_cache.set(key, entry)
+
+    return entry
+
+
+def _rename_heading_id(html: str, old: str, new: str) -> str:
+    html = html.replace(f'id="{old}"', f'id="{new}"', 1)
+    return html.replace(
+        f'class="toc-link" href="#{old}"', f'class="toc-link" href="#{new}"', 1
+    )
+
+
+def render_preview(content: str) -> str:
+    if not content:
+        return ""
+
+    blocks = split_blocks(content)
+    if blocks is None:
+        return render_markdown(content)
+
+    parts = []
+    used_ids: set[str] = set()
+
+    for block in blocks:
+        entry = _render_block(block)
+        if entry is None:
+            return render_markdown(content)
+
+        html, ids = entry
+
+        # the toc extension de-duplicates heading ids across the whole
+        # document. a lone heading can be renamed the same way, anything
+        # else is left to a full render
+        if used_ids.isdisjoint(ids):
+            used_ids.update(ids)
+        elif len(ids) == 1:
+            (old,) = ids
+            html = _rename_heading_id(html, old, unique(old, used_ids))
+        else:
+            return render_markdown(content)
+
+        parts.append(html)
+
+    return "".join(parts).rstrip()
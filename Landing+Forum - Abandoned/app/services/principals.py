@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import AuthInvalidation, User, UserRole
+from app.services.auth import token_cache
+
+
+PRINCIPAL_CACHE_SIZE = 10000
+
+# other workers drop a revoked principal on their next poll; the ttl only
+# bounds staleness should polling stall
+PRINCIPAL_CACHE_TTL = 60.0
+AUTH_INVALIDATION_POLL_INTERVAL = 1.0
+AUTH_INVALIDATION_PRUNE_INTERVAL = 600
+AUTH_INVALIDATION_RETENTION = timedelta(hours=1)
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    role: UserRole
+    is_active: bool
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        max_entries: int = PRINCIPAL_CACHE_SIZE,
+        ttl: float = PRINCIPAL_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.generation = 0
+        self.last_invalidation_id: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[int, tuple[float, Principal]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+
+            if entry is not None:
+                expires_at, principal = entry
+
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return principal
+
+                del self._entries[user_id]
+
+            self.misses += 1
+            return None
+
+    def set(self, principal: Principal, generation: int) -> None:
+        with self._lock:
+            # an invalidation that landed while the row was being read may
+            # have been for this very user
+            if generation != self.generation:
+                return
+
+            self._entries[principal.id] = (
+                time.monotonic() + self.ttl, principal
+            )
+            self._entries.move_to_end(principal.id)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *user_ids: int) -> None:
+        with self._lock:
+            self.generation += 1
+
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+async def load_principal(
+    db: AsyncSession, user_id: int
+) -> Optional[Principal]:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    generation = principal_cache.generation
+
+    row = (await db.execute(
+        select(User.id, User.username, User.role, User.is_active)
+        .where(User.id == user_id)
+    )).first()
+
+    if row is None:
+        return None
+
+    principal = Principal(
+        id=row.id,
+        username=row.username,
+        role=row.role,
+        is_active=bool(row.is_active),
+    )
+    principal_cache.set(principal, generation)
+
+    return principal
+
+
+def revoke_principal(db: AsyncSession, user_id: int) -> None:
+    # recorded in the caller's transaction so other workers hear about it
+    # exactly when the change itself becomes visible. this worker also
+    # picks the row up on its next poll, which covers a request that read
+    # the old row between this call and the commit
+    db.add(AuthInvalidation(user_id=user_id))
+    principal_cache.invalidate(user_id)
+    token_cache.purge_user(user_id)
+
+
+def sync_invalidations(db: Session) -> int:
+    last_id = principal_cache.last_invalidation_id
+
+    # a fresh worker has nothing cached, so older rows are of no interest
+    if last_id is None:
+        principal_cache.last_invalidation_id = db.query(
+            func.coalesce(func.max(AuthInvalidation.id), 0)
+        ).scalar()
+        return 0
+
+    rows = db.query(
+        AuthInvalidation.id, AuthInvalidation.user_id
+    ).filter(
+        AuthInvalidation.id > last_id
+    ).order_by(AuthInvalidation.id).all()
+
+    if rows:
+        user_ids = {user_id for _, user_id in rows}
+
+        principal_cache.invalidate(*user_ids)
+        for user_id in user_ids:
+            token_cache.purge_user(user_id)
+
+        principal_cache.last_invalidation_id = rows[-1].id
+
+    return len(rows)
+
+
+def prune_invalidations(db: Session) -> int:
+    cutoff = datetime.now(timezone.utc) - AUTH_INVALIDATION_RETENTION
+
+    deleted = db.query(AuthInvalidation).filter(
+        AuthInvalidation.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    return deleted
@@ -0,0 +1,138 @@
+import html
+import re
+from typing import Optional
+
+from sqlalchemy import (
+    DDL,
+    Select,
+    column,
+    event,
+    literal_column,
+    table,
+    text,
+)
+from sqlalchemy.orm import Session
+
+from app.models import Paper
+from app.services.markdown import render_markdown
+
+
+SEARCH_TABLE = "papers_fts"
+
+# title and tags outrank body text
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+SNIPPET_TOKENS = 16
+
+search_table = table(SEARCH_TABLE, column("rowid"))
+
+CREATE_SEARCH_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+    "USING fts5(title, tags, body, tokenize = 'porter unicode61')"
+)
+
+# fts5 snippets mark matches with these, they are swapped for <mark> once
+# the surrounding text has been escaped
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+
+_PERMALINK_RE = re.compile(r'<a class="toc-link"[^>]*>.*?</a>')
+_TAG_RE = re.compile(r"<[^>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+_TERM_RE = re.compile(r"\w+")
+
+event.listen(Paper.__table__, "after_create", DDL(CREATE_SEARCH_TABLE))
+
+
+def create_search_table(db) -> None:
+    db.execute(text(CREATE_SEARCH_TABLE))
+
+
+def plain_text(paper: Paper) -> str:
+    content_html = paper.content_html
+    if content_html is None:
+        content_html = render_markdown(paper.content)
+
+    body = _PERMALINK_RE.sub("", content_html)
+    body = html.unescape(_TAG_RE.sub(" ", body))
+
+    return _WHITESPACE_RE.sub(" ", body).strip()
+
+
+def index_paper(db: Session, paper: Paper) -> None:
+    remove_paper(db, paper.id)
+
+    if not paper.is_published:
+        return
+
+    db.execute(
+        text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, tags, body) "
+            "VALUES (:id, :title, :tags, :body)"
+        ),
+        {
+            "id": paper.id,
+            "title": paper.title,
+            "tags": " ".join(paper.tags_list),
+            "body": plain_text(paper),
+        },
+    )
+
+
+def reindex_papers(db: Session, paper_ids: list[int]) -> int:
+    for paper_id in paper_ids:
+        remove_paper(db, paper_id)
+
+    papers = db.query(Paper).filter(
+        Paper.id.in_(paper_ids),
+        Paper.is_published,
+    ).all()
+
+    for paper in papers:
+        index_paper(db, paper)
+
+    return len(papers)
+
+
+def remove_paper(db: Session, paper_id: int) -> None:
+    db.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"),
+        {"id": paper_id},
+    )
+
+
+def build_match_query(term: str) -> Optional[str]:
+    # quote every word so user input never reaches the fts5 query syntax,
+    # the trailing * keeps search-as-you-type working on partial words
+    words = _TERM_RE.findall(term)
+    if not words:
+        return None
+
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def apply_search(statement: Select, match: str) -> Select:
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+
+    snippet = literal_column(
+        f"snippet({SEARCH_TABLE}, 2, '{_MATCH_START}', '{_MATCH_END}', "
+        f"'…', {SNIPPET_TOKENS})"
+    )
+
+    return statement.add_columns(snippet).join(
+        search_table, search_table.c.rowid == Paper.id
+    ).where(
+        text(f"{SEARCH_TABLE} MATCH :match").bindparams(match=match)
+    ).order_by(
+        text(f"bm25({SEARCH_TABLE}, {weights})"), Paper.id.desc()
+    )
+
+
+def format_snippet(snippet: Optional[str]) -> Optional[str]:
+    if not snippet:
+        return None
+
+    escaped = html.escape(snippet)
+    return escaped.replace(_MATCH_START, "<mark>").replace(
+        _MATCH_END, "</mark>"
+    )
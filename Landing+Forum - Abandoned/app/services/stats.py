@@ -1,28 +1,138 @@
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Update, func, select, update
 
-from app.models import User, Paper
+from app.models import User, Paper, Vote
 
 
-def update_user_stats(db: Session, user_id: int) -> User:
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+REPUTATION_PER_PAPER = 50
+REPUTATION_PER_VOTE = 10
+
+
+def user_stats_delta(
+    user_id: int, papers: int = 0, votes: int = 0
+) -> Optional[Update]:
+    # applied in the caller's transaction as relative updates, so reads
+    # never have to recount and concurrent writers never lose an update
+    if not papers and not votes:
         return None
 
-    papers_count = db.query(func.count(Paper.id)).filter(
-        Paper.author_id == user_id,
-        Paper.is_published
-    ).scalar() or 0
+    reputation = papers * REPUTATION_PER_PAPER + votes * REPUTATION_PER_VOTE
+
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            papers_count=func.max(User.papers_count + papers, 0),
+            votes_received=func.max(User.votes_received + votes, 0),
+            reputation_points=func.max(
+                User.reputation_points + reputation, 0
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def adjust_user_stats(
+    db: Session, user_id: int, papers: int = 0, votes: int = 0
+) -> None:
+    statement = user_stats_delta(user_id, papers, votes)
+    if statement is not None:
+        db.execute(statement)
+
+
+async def adjust_user_stats_async(
+    db: AsyncSession, user_id: int, papers: int = 0, votes: int = 0
+) -> None:
+    statement = user_stats_delta(user_id, papers, votes)
+    if statement is not None:
+        await db.execute(statement)
+
+
+def recalculate_user_range(db: Session, first_id: int, last_id: int) -> int:
+    papers = select(
+        Paper.author_id.label("user_id"),
+        func.count(Paper.id).label("papers"),
+    ).where(
+        Paper.is_published,
+        Paper.author_id.between(first_id, last_id),
+    ).group_by(Paper.author_id).subquery()
 
-    user.papers_count = papers_count
+    votes = select(
+        Paper.author_id.label("user_id"),
+        func.count(Vote.id).label("votes"),
+    ).join(
+        Paper, Paper.id == Vote.paper_id
+    ).where(
+        Paper.author_id.between(first_id, last_id)
+    ).group_by(Paper.author_id).subquery()
 
+    stats = select(
+        User.id.label("user_id"),
+        func.coalesce(papers.c.papers, 0).label("papers"),
+        func.coalesce(votes.c.votes, 0).label("votes"),
+    ).outerjoin(
+        papers, papers.c.user_id == User.id
+    ).outerjoin(
+        votes, votes.c.user_id == User.id
+    ).where(
+        User.id.between(first_id, last_id)
+    ).subquery()
+
+    # the counts are taken inside the update itself, so a vote landing
+    # mid-run either is counted here or applies its delta afterwards
+    return db.execute(
+        update(User)
+        .where(User.id == stats.c.user_id)
+        .values(
+            papers_count=stats.c.papers,
+            votes_received=stats.c.votes,
+            reputation_points=(
+                stats.c.papers * REPUTATION_PER_PAPER
+                + stats.c.votes * REPUTATION_PER_VOTE
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def update_user_stats(db: Session, user_id: int) -> User:
+    recalculate_user_range(db, user_id, user_id)
     db.commit()
-    db.refresh(user)
 
-    return user
+    return db.query(User).filter(User.id == user_id).first()
+
+
+def recalculate_all_user_stats(
+    db: Session,
+    batch_size: int = 1000,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    total = db.query(func.count(User.id)).scalar() or 0
+    done = 0
+    last_id = 0
+
+    while True:
+        ids = [
+            user_id for user_id, in db.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(batch_size)
+        ]
+
+        if not ids:
+            break
+
+        # one short write transaction per batch keeps votes and edits
+        # flowing while the recompute runs
+        recalculate_user_range(db, ids[0], ids[-1])
+        db.commit()
+
+        last_id = ids[-1]
+        done += len(ids)
 
+        if progress is not None:
+            progress(done, total)
 
-def recalculate_all_user_stats(db: Session):
-    users = db.query(User).all()
-    for user in users:
-        update_user_stats(db, user.id)
+    return done
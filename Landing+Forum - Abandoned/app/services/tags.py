@@ -0,0 +1,66 @@
+from sqlalchemy import Insert, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Paper, Tag
+
+
+MAX_TAG_LENGTH = 64
+
+
+def normalize_tag(name: str) -> str:
+    return name.strip().lower()[:MAX_TAG_LENGTH]
+
+
+def normalize_tags(names: list[str]) -> list[str]:
+    normalized = []
+
+    for name in names or []:
+        tag = normalize_tag(name)
+        if tag and tag not in normalized:
+            normalized.append(tag)
+
+    return normalized
+
+
+def create_tags(names: list[str]) -> Insert:
+    # concurrent writers may create the same tag, so let the unique index
+    # settle it instead of checking first
+    return insert(Tag).values(
+        [{"name": name} for name in names]
+    ).on_conflict_do_nothing(index_elements=["name"])
+
+
+def get_or_create_tags(db: Session, names: list[str]) -> list[Tag]:
+    names = normalize_tags(names)
+    if not names:
+        return []
+
+    db.execute(create_tags(names))
+
+    tags = db.query(Tag).filter(Tag.name.in_(names)).all()
+    return sorted(tags, key=lambda tag: tag.name)
+
+
+async def get_or_create_tags_async(
+    db: AsyncSession, names: list[str]
+) -> list[Tag]:
+    names = normalize_tags(names)
+    if not names:
+        return []
+
+    await db.execute(create_tags(names))
+
+    tags = await db.scalars(select(Tag).where(Tag.name.in_(names)))
+    return sorted(tags, key=lambda tag: tag.name)
+
+
+def set_paper_tags(db: Session, paper: Paper, names: list[str]) -> None:
+    paper.tags = get_or_create_tags(db, names)
+
+
+async def set_paper_tags_async(
+    db: AsyncSession, paper: Paper, names: list[str]
+) -> None:
+    paper.tags = await get_or_create_tags_async(db, names)
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import bindparam, case, update
+from sqlalchemy.orm import Session
+
+from app.models import Paper
+
+
+# hacker news style decay: votes / (age_hours + 2) ^ gravity
+TRENDING_GRAVITY = 1.8
+
+# older papers drop to 0 so the decay job stops revisiting them
+TRENDING_MAX_AGE = timedelta(days=30)
+
+TRENDING_BATCH_SIZE = 500
+TRENDING_DECAY_INTERVAL = 300
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def trending_factor(
+    published_at: Optional[datetime], now: Optional[datetime] = None
+) -> float:
+    # the score is linear in votes, so a vote adds exactly this much to it
+    if published_at is None:
+        return 0.0
+
+    # sqlite hands datetimes back naive, fresh ones still carry utc
+    if published_at.tzinfo is not None:
+        published_at = published_at.astimezone(timezone.utc).replace(
+            tzinfo=None
+        )
+
+    age = max((now or _utcnow()) - published_at, timedelta(0))
+    if age > TRENDING_MAX_AGE:
+        return 0.0
+
+    age_hours = age.total_seconds() / 3600
+    return 1 / (age_hours + 2) ** TRENDING_GRAVITY
+
+
+def trending_score(
+    vote_count: int,
+    published_at: Optional[datetime],
+    now: Optional[datetime] = None,
+) -> float:
+    if vote_count <= 0:
+        return 0.0
+
+    return vote_count * trending_factor(published_at, now)
+
+
+def refresh_trending_score(paper: Paper) -> None:
+    paper.trending_score = trending_score(
+        paper.vote_count, paper.published_at
+    )
+
+
+_decay_statement = update(Paper.__table__).where(
+    Paper.__table__.c.id == bindparam("paper_id")
+).values(
+    trending_score=case(
+        (
+            Paper.__table__.c.vote_count > 0,
+            Paper.__table__.c.vote_count * bindparam("factor"),
+        ),
+        else_=0.0,
+    )
+)
+
+
+def decay_trending_scores(
+    db: Session, batch_size: int = TRENDING_BATCH_SIZE
+) -> int:
+    now = _utcnow()
+    decayed = 0
+    last_id = 0
+
+    while True:
+        rows = db.query(
+            Paper.id, Paper.published_at
+        ).filter(
+            Paper.id > last_id,
+            Paper.is_published,
+            Paper.trending_score > 0,
+        ).order_by(Paper.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        # one short write transaction per batch so voting never waits long.
+        # the score is linear in votes, so only the age factor is worked out
+        # here and the vote count is read by the update itself, a vote that
+        # lands after the select is not overwritten
+        db.execute(
+            _decay_statement,
+            [
+                {
+                    "paper_id": paper_id,
+                    "factor": trending_factor(published_at, now),
+                }
+                for paper_id, published_at in rows
+            ],
+        )
+        db.commit()
+
+        last_id = rows[-1].id
+        decayed += len(rows)
+
+    return decayed
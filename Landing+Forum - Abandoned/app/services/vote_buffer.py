@@ -0,0 +1,543 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, TextIO
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import Paper
+from app.services.events import VoteCast, VoteRetracted, event_bus
+from app.services.leaderboard import load_paper_states
+from app.services.votes import (
+    VoteRow,
+    apply_vote_delta,
+    load_vote_counts,
+    load_vote_statuses,
+    voted_paper_ids,
+    write_vote,
+)
+
+
+VOTE_FLUSH_INTERVAL = 0.05
+VOTE_FLUSH_BATCH = 500
+VOTE_COMMIT_WAIT = 0.005
+
+logger = logging.getLogger(__name__)
+
+VoteKey = tuple[int, int]
+
+
+def _lock_journal(journal: TextIO) -> bool:
+    try:
+        fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+
+    return True
+
+
+def read_journal(path: Path) -> dict[VoteKey, bool]:
+    latest: dict[VoteKey, tuple[int, bool]] = {}
+
+    with open(path, encoding="utf-8") as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+                key = (entry["paper_id"], entry["user_id"])
+                seq = entry.get("seq", 0)
+                voted = bool(entry["voted"])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                # a crash mid-append leaves at most one torn line at the end
+                continue
+
+            # appends from different threads can land out of order, the
+            # sequence number says which change came last
+            if key not in latest or seq >= latest[key][0]:
+                latest[key] = (seq, voted)
+
+    return {key: voted for key, (_, voted) in latest.items()}
+
+
+def write_votes(
+    db: Session, changes: dict[VoteKey, bool]
+) -> dict[VoteKey, bool]:
+    # every change is applied the same way as an unbuffered vote, so
+    # replaying a journal that was already flushed changes nothing
+    paper_ids = {paper_id for paper_id, _ in changes}
+    papers = {
+        paper.id: paper
+        for paper in db.query(
+            Paper.id, Paper.author_id, Paper.published_at
+        ).filter(Paper.id.in_(paper_ids))
+    }
+
+    applied = {}
+    deltas: defaultdict[int, int] = defaultdict(int)
+
+    for (paper_id, user_id), voted in changes.items():
+        if paper_id not in papers:
+            continue
+
+        if write_vote(db, paper_id, user_id, voted):
+            applied[(paper_id, user_id)] = voted
+            deltas[paper_id] += 1 if voted else -1
+
+    deltas = {
+        paper_id: delta for paper_id, delta in deltas.items() if delta
+    }
+
+    for paper_id, delta in deltas.items():
+        apply_vote_delta(db, papers[paper_id], delta)
+
+    return applied
+
+
+class VoteBuffer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        journal_dir: str,
+        flush_interval: float = VOTE_FLUSH_INTERVAL,
+        flush_batch: int = VOTE_FLUSH_BATCH,
+    ):
+        self.session_factory = session_factory
+        self.journal_dir = Path(journal_dir)
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+
+        self.flushes = 0
+        self.flushed_votes = 0
+
+        # votes accepted since the last flush, and the batch being written
+        self._pending: dict[VoteKey, bool] = {}
+        self._pending_deltas: defaultdict[int, int] = defaultdict(int)
+        self._flushing: dict[VoteKey, bool] = {}
+        self._flushing_deltas: defaultdict[int, int] = defaultdict(int)
+        self._flushing_journals: list[TextIO] = []
+
+        # bumped whenever a batch lands, so reads taken before it are
+        # retried. while a commit is landing, reads are retried as well
+        self._epoch = 0
+        self._committing = False
+
+        # every journal stays locked by its worker until it is deleted, so
+        # a journal nobody holds belongs to a worker that is gone. pids get
+        # reused across restarts, so names carry an instance id as well
+        self._instance = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self._journal: Optional[TextIO] = None
+        self._journal_seq = 0
+        self._entry_seq = 0
+
+        # the state lock is taken on the event loop and is never held across
+        # file i/o, journal writes and closes take the journal lock instead
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.replay_orphans()
+
+        self._journal = self._new_journal()
+
+        self._thread = threading.Thread(
+            target=self._run, name="vote-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        try:
+            self.flush()
+        except Exception:
+            # whatever is left stays journaled and is replayed on startup
+            logger.exception("final vote flush failed")
+
+        with self._lock:
+            journals = list(self._flushing_journals)
+            current, self._journal = self._journal, None
+            drained = not self._pending
+
+        if current is not None:
+            if drained:
+                Path(current.name).unlink(missing_ok=True)
+            journals.append(current)
+
+        # closing releases the locks, leaving unflushed journals to be
+        # replayed by whichever worker starts next
+        with self._journal_lock:
+            for journal in journals:
+                journal.close()
+
+    async def statuses(
+        self, user_id: int, load: Callable[[], Awaitable[list[VoteRow]]]
+    ) -> list[VoteRow]:
+        def apply(rows: list[VoteRow]) -> list[VoteRow]:
+            return [
+                (
+                    paper_id,
+                    self._voted(paper_id, user_id, db_voted),
+                    self._count(paper_id, vote_count),
+                )
+                for paper_id, db_voted, vote_count in rows
+            ]
+
+        return await self._read_consistent(load, apply)
+
+    async def voted_paper_ids(
+        self, db: AsyncSession, user_id: int, paper_ids: list[int]
+    ) -> set[int]:
+        def apply(voted: set[int]) -> set[int]:
+            return {
+                paper_id
+                for paper_id in paper_ids
+                if self._voted(paper_id, user_id, paper_id in voted)
+            }
+
+        return await self._read_consistent(
+            partial(voted_paper_ids, db, user_id, paper_ids), apply
+        )
+
+    async def vote_counts(
+        self, db: AsyncSession, paper_ids: list[int]
+    ) -> dict[int, int]:
+        def apply(rows: list[tuple[int, int]]) -> dict[int, int]:
+            return {
+                paper_id: self._count(paper_id, vote_count)
+                for paper_id, vote_count in rows
+            }
+
+        return await self._read_consistent(
+            partial(load_vote_counts, db, paper_ids), apply
+        )
+
+    async def cast(
+        self, db: AsyncSession, paper_id: int, user_id: int
+    ) -> Optional[int]:
+        return await self._submit(db, paper_id, user_id, voted=True)
+
+    async def retract(
+        self, db: AsyncSession, paper_id: int, user_id: int
+    ) -> Optional[int]:
+        return await self._submit(db, paper_id, user_id, voted=False)
+
+    def flush(self) -> int:
+        # a batch that failed to commit is retried before anything new. only
+        # the flush thread, or stop once it has joined, flushes and votes can
+        # only be added meanwhile, so the next journal is opened up front
+        next_journal = None
+        if not self._flushing:
+            if not self._pending:
+                return 0
+
+            next_journal = self._new_journal()
+
+        with self._lock:
+            if next_journal is not None:
+                self._flushing = self._pending
+                self._flushing_deltas = self._pending_deltas
+                self._pending = {}
+                self._pending_deltas = defaultdict(int)
+
+                self._flushing_journals.append(self._journal)
+                self._journal = next_journal
+
+            changes = dict(self._flushing)
+            journals = list(self._flushing_journals)
+
+        def flushed() -> None:
+            self._flushing = {}
+            self._flushing_deltas = defaultdict(int)
+            self._flushing_journals = []
+
+            self.flushes += 1
+            self.flushed_votes += len(changes)
+
+        self._write(changes, flushed)
+
+        # unlinked before the lock is released, so no other worker can
+        # claim a journal that was already applied
+        for journal in journals:
+            Path(journal.name).unlink(missing_ok=True)
+
+            with self._journal_lock:
+                journal.close()
+
+        return len(changes)
+
+    def replay_orphans(self) -> int:
+        replayed = 0
+
+        journals = sorted(
+            self.journal_dir.glob("votes-*.jsonl"),
+            key=lambda path: path.stat().st_mtime,
+        )
+
+        for path in journals:
+            try:
+                journal = open(path, encoding="utf-8")
+            except FileNotFoundError:
+                continue
+
+            try:
+                if not _lock_journal(journal):
+                    continue
+
+                # another worker may have replayed and deleted it between
+                # the open and the lock
+                try:
+                    inode = os.stat(path).st_ino
+                except FileNotFoundError:
+                    continue
+
+                if inode != os.fstat(journal.fileno()).st_ino:
+                    continue
+
+                changes = read_journal(path)
+
+                if changes:
+                    self._write(changes)
+
+                path.unlink()
+                replayed += len(changes)
+            finally:
+                journal.close()
+
+        if replayed:
+            logger.info("replayed %d journaled votes", replayed)
+
+        return replayed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "flushing": len(self._flushing),
+                "flushes": self.flushes,
+                "flushed_votes": self.flushed_votes,
+            }
+
+    async def _submit(
+        self, db: AsyncSession, paper_id: int, user_id: int, voted: bool
+    ) -> Optional[int]:
+        def apply(rows: list[VoteRow]):
+            (_, db_voted, vote_count), = rows
+
+            if self._voted(paper_id, user_id, db_voted) == voted:
+                return None
+
+            self._pending[(paper_id, user_id)] = voted
+            self._pending_deltas[paper_id] += 1 if voted else -1
+            self._entry_seq += 1
+
+            if len(self._pending) >= self.flush_batch:
+                self._wake.set()
+
+            entry = json.dumps({
+                "paper_id": paper_id,
+                "user_id": user_id,
+                "voted": voted,
+                "seq": self._entry_seq,
+            })
+
+            return self._count(paper_id, vote_count), self._journal, entry
+
+        accepted = await self._read_consistent(
+            partial(load_vote_statuses, db, user_id, Paper.id == paper_id),
+            apply,
+        )
+        if accepted is None:
+            return None
+
+        vote_count, journal, entry = accepted
+
+        # the vote is only acknowledged once it is journaled
+        await run_in_threadpool(self._append, journal, entry)
+
+        return vote_count
+
+    def _append(self, journal: TextIO, entry: str) -> None:
+        with self._journal_lock:
+            # a journal is closed once its batch has committed, or when the
+            # worker stops and nothing more is accepted
+            if journal.closed:
+                return
+
+            journal.write(entry + "\n")
+            journal.flush()
+
+    def _write(
+        self,
+        changes: dict[VoteKey, bool],
+        committed: Optional[Callable[[], None]] = None,
+    ) -> None:
+        db = self.session_factory()
+        try:
+            applied = write_votes(db, changes)
+
+            # a read landing together with the commit would count these
+            # votes in the rows and again in the buffered deltas
+            with self._lock:
+                self._committing = True
+
+            try:
+                db.commit()
+            except Exception:
+                with self._lock:
+                    self._committing = False
+                raise
+
+            with self._lock:
+                if committed is not None:
+                    committed()
+
+                self._epoch += 1
+                self._committing = False
+
+            states = load_paper_states(
+                db, list({paper_id for paper_id, _ in applied})
+            )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        event_bus.publish(*(
+            (VoteCast if voted else VoteRetracted)(
+                paper_id, user_id, states[paper_id]
+            )
+            for (paper_id, user_id), voted in applied.items()
+            if paper_id in states
+        ))
+
+    async def _read_consistent(self, load: Callable, apply: Callable):
+        # a batch committed between loading rows and applying the buffered
+        # state would count its votes twice, so the load is retried
+        with self._lock:
+            epoch = self._epoch
+
+        while True:
+            loaded = await load()
+
+            with self._lock:
+                if self._epoch == epoch and not self._committing:
+                    return apply(loaded)
+
+                epoch = self._epoch
+                committing = self._committing
+
+            if committing:
+                await asyncio.sleep(VOTE_COMMIT_WAIT)
+
+    def _voted(self, paper_id: int, user_id: int, db_voted: bool) -> bool:
+        key = (paper_id, user_id)
+
+        if key in self._pending:
+            return self._pending[key]
+        if key in self._flushing:
+            return self._flushing[key]
+
+        return db_voted
+
+    def _count(self, paper_id: int, vote_count: int) -> int:
+        return max(
+            vote_count
+            + self._flushing_deltas.get(paper_id, 0)
+            + self._pending_deltas.get(paper_id, 0),
+            0,
+        )
+
+    def _new_journal(self) -> TextIO:
+        # the previous journal, if any, is kept open and locked by flush
+        # until its batch has been applied
+        self._journal_seq += 1
+        path = self.journal_dir / (
+            f"votes-{self._instance}-{self._journal_seq}.jsonl"
+        )
+
+        journal = open(path, "x", encoding="utf-8")
+        _lock_journal(journal)
+
+        return journal
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("vote flush failed, retrying")
+
+
+_vote_buffer: Optional[VoteBuffer] = None
+
+
+def get_vote_buffer() -> Optional[VoteBuffer]:
+    return _vote_buffer
+
+
+def start_vote_buffer(
+    session_factory: Callable[[], Session], journal_dir: str
+) -> VoteBuffer:
+    global _vote_buffer
+
+    _vote_buffer = VoteBuffer(session_factory, journal_dir)
+    _vote_buffer.start()
+
+    return _vote_buffer
+
+
+async def get_vote_statuses(
+    db: AsyncSession, user_id: int, *criteria
+) -> list[VoteRow]:
+    load = partial(load_vote_statuses, db, user_id, *criteria)
+
+    if _vote_buffer is None:
+        return await load()
+
+    return await _vote_buffer.statuses(user_id, load)
+
+
+async def get_voted_paper_ids(
+    db: AsyncSession, user_id: int, paper_ids: list[int]
+) -> set[int]:
+    if _vote_buffer is None:
+        return await voted_paper_ids(db, user_id, paper_ids)
+
+    return await _vote_buffer.voted_paper_ids(db, user_id, paper_ids)
+
+
+async def get_vote_counts(
+    db: AsyncSession, papers: list[Paper]
+) -> dict[int, int]:
+    if _vote_buffer is None:
+        return {paper.id: paper.vote_count for paper in papers}
+
+    return await _vote_buffer.vote_counts(db, [paper.id for paper in papers])
+
+
+def stop_vote_buffer() -> None:
+    global _vote_buffer
+
+    if _vote_buffer is not None:
+        _vote_buffer.stop()
+        _vote_buffer = None
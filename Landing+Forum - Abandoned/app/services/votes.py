@@ -0,0 +1,124 @@
+from typing import Optional
+
+from sqlalchemy import Executable, Update, delete, exists, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Paper, Vote
+from app.services.stats import adjust_user_stats, adjust_user_stats_async
+from app.services.trending import trending_factor
+
+
+# (paper_id, has_voted, vote_count)
+VoteRow = tuple[int, bool, int]
+
+
+async def load_vote_statuses(
+    db: AsyncSession, user_id: int, *criteria
+) -> list[VoteRow]:
+    has_voted = exists().where(
+        Vote.paper_id == Paper.id, Vote.user_id == user_id
+    )
+
+    rows = await db.execute(
+        select(Paper.id, has_voted, Paper.vote_count).where(*criteria)
+    )
+
+    return [tuple(row) for row in rows]
+
+
+async def load_vote_counts(
+    db: AsyncSession, paper_ids: list[int]
+) -> list[tuple[int, int]]:
+    if not paper_ids:
+        return []
+
+    rows = await db.execute(
+        select(Paper.id, Paper.vote_count).where(Paper.id.in_(paper_ids))
+    )
+
+    return [tuple(row) for row in rows]
+
+
+async def voted_paper_ids(
+    db: AsyncSession, user_id: int, paper_ids: list[int]
+) -> set[int]:
+    if not paper_ids:
+        return set()
+
+    rows = await db.scalars(
+        select(Vote.paper_id).where(
+            Vote.user_id == user_id, Vote.paper_id.in_(paper_ids)
+        )
+    )
+
+    return set(rows)
+
+
+def vote_delta(paper: Paper, delta: int) -> Update:
+    # both counters move inside the statement itself, so concurrent voters
+    # never overwrite each other's increments
+    vote_count = func.max(Paper.vote_count + delta, 0)
+
+    return (
+        update(Paper)
+        .where(Paper.id == paper.id)
+        .values(
+            vote_count=vote_count,
+            trending_score=vote_count * trending_factor(paper.published_at),
+        )
+        .returning(Paper.vote_count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def vote_change(paper_id: int, user_id: int, voted: bool) -> Executable:
+    if voted:
+        # the unique constraint decides who wins a double vote, a
+        # conflicting insert is simply skipped
+        return insert(Vote).values(
+            paper_id=paper_id, user_id=user_id
+        ).on_conflict_do_nothing(index_elements=["paper_id", "user_id"])
+
+    return delete(Vote).where(
+        Vote.paper_id == paper_id, Vote.user_id == user_id
+    ).execution_options(synchronize_session=False)
+
+
+def apply_vote_delta(db: Session, paper: Paper, delta: int) -> int:
+    new_count = db.execute(vote_delta(paper, delta)).scalar_one()
+    adjust_user_stats(db, paper.author_id, votes=delta)
+
+    return new_count
+
+
+def write_vote(db: Session, paper_id: int, user_id: int, voted: bool) -> bool:
+    return db.execute(vote_change(paper_id, user_id, voted)).rowcount > 0
+
+
+async def _change_vote(
+    db: AsyncSession, paper: Paper, user_id: int, voted: bool
+) -> Optional[int]:
+    result = await db.execute(vote_change(paper.id, user_id, voted))
+    if result.rowcount == 0:
+        return None
+
+    delta = 1 if voted else -1
+
+    new_count = (await db.execute(vote_delta(paper, delta))).scalar_one()
+    await adjust_user_stats_async(db, paper.author_id, votes=delta)
+
+    return new_count
+
+
+async def cast_vote(
+    db: AsyncSession, paper: Paper, user_id: int
+) -> Optional[int]:
+    return await _change_vote(db, paper, user_id, voted=True)
+
+
+async def retract_vote(
+    db: AsyncSession, paper: Paper, user_id: int
+) -> Optional[int]:
+    return await _change_vote(db, paper, user_id, voted=False)
@@ -72,4 +72,5 @@ export const votes = {
     status: (slug) => api(`/papers/${slug}/vote/`),
     upvote: (slug) => api(`/papers/${slug}/vote/`, { method: 'POST' }),
     remove: (slug) => api(`/papers/${slug}/vote/`, { method: 'DELETE' }),
+    statuses: (slugs) => api('/votes/status', { method: 'POST', body: JSON.stringify({ slugs }) }),
 };
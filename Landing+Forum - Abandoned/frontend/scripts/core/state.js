@@ -9,6 +9,7 @@ export const state = {
     feed: {
         papers: [],
         page: 1,
+        cursor: null,
         
         has_more: true,
         is_loading: false,
@@ -37,6 +38,7 @@ export function reset_feed() {
     state.feed = {
         papers: [],
         page: 1,
+        cursor: null,
         has_more: true,
         is_loading: false,
         total: 0,
@@ -47,11 +49,12 @@ export function set_feed_loading(is_loading) {
     state.feed.is_loading = is_loading;
 }
 
-export function append_papers(papers, total, totalPages) {
+export function append_papers(papers, total, next_cursor) {
     state.feed.papers.push(...papers);
 
-    state.feed.total = total;
-    state.feed.has_more = state.feed.page < totalPages;
+    if (total !== null && total !== undefined) state.feed.total = total;
+    state.feed.cursor = next_cursor;
+    state.feed.has_more = !!next_cursor;
     state.feed.page++;
 }
 
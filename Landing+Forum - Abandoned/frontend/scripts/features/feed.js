@@ -73,16 +73,17 @@ async function load_more_papers() {
     try {
         const params = {
             sort: state.current_sort,
-            page: state.feed.page,
             page_size: state.page_size,
         };
+
+        if (state.feed.cursor) params.cursor = state.feed.cursor;
         
         const search_input = $('search-input')?.value.trim();
         if (search_input) params.search = search_input;
         
         const data = await papers.list(params);
 
-        append_papers(data.papers, data.total, data.total_pages);
+        append_papers(data.papers, data.total, data.next_cursor);
         render_current_papers();
         
     } catch (error) {
@@ -146,7 +147,7 @@ function render_paper_card(paper) {
                 </div>
 
                 <div class="paper-stats">
-                    <span>^ ${paper.vote_count}</span>
+                    <span class="${paper.user_has_voted ? 'voted' : ''}">^ ${paper.vote_count}</span>
                 </div>
             </div>
         </div>
@@ -0,0 +1,40 @@
+"""store rendered paper html
+
+Revision ID: 3f9a2c7d1e04
+Revises: 8819b542bd65
+Create Date: 2026-10-18 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a2c7d1e04'
+down_revision: Union[str, Sequence[str], None] = '8819b542bd65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the html depends on the renderer of the day, so existing rows are
+    # rendered by `python scripts/render_papers.py` rather than here
+    with op.batch_alter_table('papers') as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=True))
+        batch_op.add_column(
+            sa.Column('content_html_version', sa.Integer(), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column('content_hash', sa.String(length=64), nullable=True)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('papers') as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('content_html_version')
+        batch_op.drop_column('content_html')
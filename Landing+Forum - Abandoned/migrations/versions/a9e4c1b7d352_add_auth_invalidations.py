@@ -0,0 +1,45 @@
+"""add auth invalidations
+
+Revision ID: a9e4c1b7d352
+Revises: f1b6d2e8a347
+Create Date: 2026-10-18 19:05:12.730418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4c1b7d352'
+down_revision: Union[str, Sequence[str], None] = 'f1b6d2e8a347'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'auth_invalidations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index(
+        op.f('ix_auth_invalidations_created_at'),
+        'auth_invalidations',
+        ['created_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f('ix_auth_invalidations_created_at'),
+        table_name='auth_invalidations',
+    )
+    op.drop_table('auth_invalidations')
@@ -0,0 +1,54 @@
+"""add keyset pagination indexes
+
+Revision ID: b84e1d6c2a95
+Revises: 3f9a2c7d1e04
+Create Date: 2026-10-18 11:47:05.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84e1d6c2a95'
+down_revision: Union[str, Sequence[str], None] = '3f9a2c7d1e04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keyset cursors over published_at assume every published paper has one
+    op.execute(
+        sa.text(
+            "UPDATE papers SET published_at = created_at "
+            "WHERE is_published = 1 AND published_at IS NULL"
+        )
+    )
+
+    op.create_index(
+        'ix_papers_feed_recent',
+        'papers',
+        ['is_published', 'published_at', 'id'],
+    )
+    op.create_index(
+        'ix_papers_feed_top', 'papers', ['is_published', 'vote_count', 'id']
+    )
+    op.create_index(
+        'ix_papers_author_created', 'papers', ['author_id', 'created_at', 'id']
+    )
+    op.create_index(
+        'ix_papers_author_published',
+        'papers',
+        ['author_id', 'published_at', 'id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_papers_author_published', table_name='papers')
+    op.drop_index('ix_papers_author_created', table_name='papers')
+    op.drop_index('ix_papers_feed_top', table_name='papers')
+    op.drop_index('ix_papers_feed_recent', table_name='papers')
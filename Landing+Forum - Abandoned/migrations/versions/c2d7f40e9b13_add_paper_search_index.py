@@ -0,0 +1,31 @@
+"""add paper search index
+
+Revision ID: c2d7f40e9b13
+Revises: b84e1d6c2a95
+Create Date: 2026-10-18 14:03:22.671940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7f40e9b13'
+down_revision: Union[str, Sequence[str], None] = 'b84e1d6c2a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rows are indexed by `python scripts/search_index.py --rebuild`
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts "
+        "USING fts5(title, tags, body, tokenize = 'porter unicode61')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS papers_fts")
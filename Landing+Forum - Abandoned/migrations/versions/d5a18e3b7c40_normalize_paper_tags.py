@@ -0,0 +1,94 @@
+"""normalize paper tags
+
+Revision ID: d5a18e3b7c40
+Revises: c2d7f40e9b13
+Create Date: 2026-10-18 15:26:48.093355
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a18e3b7c40'
+down_revision: Union[str, Sequence[str], None] = 'c2d7f40e9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tags = op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tags_id', 'tags', ['id'])
+    op.create_index('ix_tags_name', 'tags', ['name'], unique=True)
+
+    paper_tags = op.create_table(
+        'paper_tags',
+        sa.Column('paper_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['paper_id'], ['papers.id'], ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('paper_id', 'tag_id'),
+    )
+    op.create_index(
+        'ix_paper_tags_tag_paper', 'paper_tags', ['tag_id', 'paper_id']
+    )
+
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text("SELECT id, tags FROM papers WHERE tags IS NOT NULL")
+    ).fetchall()
+
+    tag_ids = {}
+    links = []
+
+    for paper_id, csv in rows:
+        names = []
+        for name in csv.split(","):
+            name = name.strip().lower()[:64]
+            if name and name not in names:
+                names.append(name)
+
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = bind.execute(
+                    tags.insert().values(name=name)
+                ).inserted_primary_key[0]
+
+            links.append({"paper_id": paper_id, "tag_id": tag_ids[name]})
+
+    if links:
+        op.bulk_insert(paper_tags, links)
+
+    with op.batch_alter_table('papers') as batch_op:
+        batch_op.drop_column('tags')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('papers') as batch_op:
+        batch_op.add_column(
+            sa.Column('tags', sa.String(length=255), nullable=True)
+        )
+
+    op.execute(
+        "UPDATE papers SET tags = ("
+        "SELECT group_concat(tags.name, ',') FROM paper_tags "
+        "JOIN tags ON tags.id = paper_tags.tag_id "
+        "WHERE paper_tags.paper_id = papers.id)"
+    )
+
+    op.drop_index('ix_paper_tags_tag_paper', table_name='paper_tags')
+    op.drop_table('paper_tags')
+    op.drop_index('ix_tags_name', table_name='tags')
+    op.drop_index('ix_tags_id', table_name='tags')
+    op.drop_table('tags')
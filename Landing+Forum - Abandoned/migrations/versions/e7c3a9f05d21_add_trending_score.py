@@ -0,0 +1,83 @@
+"""add trending score
+
+Revision ID: e7c3a9f05d21
+Revises: d5a18e3b7c40
+Create Date: 2026-10-18 16:41:10.378902
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a9f05d21'
+down_revision: Union[str, Sequence[str], None] = 'd5a18e3b7c40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the score as it was defined when this revision was written, frozen here so
+# later changes to app.services.trending do not change this upgrade
+TRENDING_GRAVITY = 1.8
+TRENDING_MAX_AGE = timedelta(days=30)
+
+
+def trending_score(vote_count: int, published_at, now: datetime) -> float:
+    if vote_count <= 0 or published_at is None:
+        return 0.0
+
+    age = max(now - published_at, timedelta(0))
+    if age > TRENDING_MAX_AGE:
+        return 0.0
+
+    age_hours = age.total_seconds() / 3600
+    return vote_count / (age_hours + 2) ** TRENDING_GRAVITY
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('papers') as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                'trending_score',
+                sa.Float(),
+                nullable=False,
+                server_default='0',
+            )
+        )
+
+    op.create_index(
+        'ix_papers_feed_trending',
+        'papers',
+        ['is_published', 'trending_score', 'id'],
+    )
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT id, vote_count, published_at FROM papers "
+            "WHERE is_published = 1 AND vote_count > 0"
+        ).columns(published_at=sa.DateTime())
+    ).fetchall()
+
+    for paper_id, vote_count, published_at in rows:
+        bind.execute(
+            sa.text(
+                "UPDATE papers SET trending_score = :score WHERE id = :id"
+            ),
+            {
+                "id": paper_id,
+                "score": trending_score(vote_count, published_at, now),
+            },
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_papers_feed_trending', table_name='papers')
+
+    with op.batch_alter_table('papers') as batch_op:
+        batch_op.drop_column('trending_score')
@@ -0,0 +1,71 @@
+"""add listing counters
+
+Revision ID: f1b6d2e8a347
+Revises: e7c3a9f05d21
+Create Date: 2026-10-18 17:20:44.512093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d2e8a347'
+down_revision: Union[str, Sequence[str], None] = 'e7c3a9f05d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'counters',
+        sa.Column('scope', sa.String(length=128), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('scope'),
+    )
+
+    # scope names match app.services.counters, bound as parameters since
+    # their colons would otherwise read as bind markers
+    bind = op.get_bind()
+
+    bind.execute(
+        sa.text(
+            "INSERT INTO counters (scope, value) "
+            "SELECT :scope, COUNT(*) FROM papers WHERE is_published = 1"
+        ),
+        {"scope": "papers:published"},
+    )
+    bind.execute(
+        sa.text(
+            "INSERT INTO counters (scope, value) "
+            "SELECT :prefix || author_id || :suffix, COUNT(*) FROM papers "
+            "GROUP BY author_id"
+        ),
+        {"prefix": "papers:author:", "suffix": ":all"},
+    )
+    bind.execute(
+        sa.text(
+            "INSERT INTO counters (scope, value) "
+            "SELECT :prefix || author_id || :suffix, COUNT(*) FROM papers "
+            "WHERE is_published = 1 GROUP BY author_id"
+        ),
+        {"prefix": "papers:author:", "suffix": ":published"},
+    )
+    bind.execute(
+        sa.text(
+            "INSERT INTO counters (scope, value) "
+            "SELECT :prefix || tags.name || :suffix, COUNT(*) FROM tags "
+            "JOIN paper_tags ON paper_tags.tag_id = tags.id "
+            "JOIN papers ON papers.id = paper_tags.paper_id "
+            "WHERE papers.is_published = 1 GROUP BY tags.name"
+        ),
+        {"prefix": "papers:tag:", "suffix": ":published"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('counters')
@@ -0,0 +1,211 @@
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, install_pragmas, sqlite_pragmas
+from app.models import Paper, User
+from app.services.votes import apply_vote_delta, write_vote
+
+
+def seed(path: Path, users: int, papers: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+
+    now = datetime.now(timezone.utc)
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {
+                "id": user_id,
+                "username": f"bench{user_id}",
+                "email": f"bench{user_id}@example.com",
+                "password": "x",
+            }
+            for user_id in range(1, users + 1)
+        ])
+        connection.execute(insert(Paper), [
+            {
+                "id": paper_id,
+                "author_id": random.randint(1, users),
+                "title": f"Paper {paper_id}",
+                "slug": f"paper-{paper_id}",
+                "content": "benchmark " * 200,
+                "is_published": True,
+                "published_at": now - timedelta(minutes=paper_id),
+            }
+            for paper_id in range(1, papers + 1)
+        ])
+
+    engine.dispose()
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(
+    path: Path,
+    pragmas: dict[str, object],
+    readers: int,
+    writers: int,
+    duration: float,
+    users: int,
+    papers: int,
+) -> dict:
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=readers + writers,
+    )
+    install_pragmas(engine, pragmas)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    lock = threading.Lock()
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    deadline = time.monotonic() + duration
+
+    def read():
+        db = Session()
+        offset = random.randint(0, max(papers - 20, 0))
+
+        db.query(Paper.id, Paper.title, Paper.vote_count).filter(
+            Paper.is_published
+        ).order_by(
+            Paper.published_at.desc(), Paper.id.desc()
+        ).offset(offset).limit(20).all()
+        db.close()
+
+    def write():
+        db = Session()
+        try:
+            paper = db.query(
+                Paper.id, Paper.author_id, Paper.published_at
+            ).filter(Paper.id == random.randint(1, papers)).one()
+            user_id = random.randint(1, users)
+
+            # toggles the vote, the same statements a vote request runs
+            retract = not write_vote(db, paper.id, user_id, voted=True)
+            if retract:
+                write_vote(db, paper.id, user_id, voted=False)
+
+            apply_vote_delta(db, paper, -1 if retract else 1)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def worker(kind: str, operation):
+        samples = []
+        failed = 0
+
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                operation()
+            except OperationalError:
+                failed += 1
+                continue
+            samples.append(time.perf_counter() - started)
+
+        with lock:
+            latencies[kind].extend(samples)
+            errors[kind] += failed
+
+    threads = [
+        threading.Thread(target=worker, args=("read", read))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=worker, args=("write", write))
+        for _ in range(writers)
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+
+    return {
+        kind: {
+            "ops": len(samples) / duration,
+            "p50": percentile(samples, 0.5) * 1000,
+            "p95": percentile(samples, 0.95) * 1000,
+            "errors": errors[kind],
+        }
+        for kind, samples in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="compare mixed read/write throughput with and without "
+        "the sqlite pragmas from app.database"
+    )
+
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="seconds per profile"
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--papers", type=int, default=5000)
+
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-sqlite-"))
+
+    try:
+        template = workdir / "template.db"
+        seed(template, args.users, args.papers)
+
+        # journal_mode sticks to the file, so each profile gets a fresh copy
+        profiles = {"defaults": {}, "tuned": sqlite_pragmas()}
+
+        for name, pragmas in profiles.items():
+            path = workdir / f"{name}.db"
+            shutil.copy(template, path)
+
+            result = run(
+                path,
+                pragmas,
+                args.readers,
+                args.writers,
+                args.duration,
+                args.users,
+                args.papers,
+            )
+
+            print(f"{name}:")
+            for kind, stats in result.items():
+                print(
+                    f"  {kind:5} {stats['ops']:8.0f} ops/s  "
+                    f"p50 {stats['p50']:6.2f}ms  "
+                    f"p95 {stats['p95']:6.2f}ms  "
+                    f"errors {stats['errors']}"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.services.stats import recalculate_all_user_stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="users per transaction"
+    )
+
+    args = parser.parse_args()
+
+    started = time.monotonic()
+
+    def report(done: int, total: int):
+        elapsed = time.monotonic() - started
+        print(f"recalculated {done}/{total} users ({elapsed:.1f}s)")
+
+    db = SessionLocal()
+
+    try:
+        done = recalculate_all_user_stats(
+            db, batch_size=args.batch_size, progress=report
+        )
+        print(f"\n{done} users recalculated")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
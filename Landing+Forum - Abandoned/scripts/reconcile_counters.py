@@ -0,0 +1,41 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.services.counters import reconcile_counters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="report drifted counters without repairing them",
+    )
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        drift = reconcile_counters(db)
+
+        for scope, (stored, expected) in sorted(drift.items()):
+            print(f"{scope}: {stored} -> {expected}")
+
+        if args.dry_run:
+            db.rollback()
+            print(f"\n{len(drift)} counters drifted")
+        else:
+            db.commit()
+            print(f"\n{len(drift)} counters repaired")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
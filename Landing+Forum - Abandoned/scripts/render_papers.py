@@ -0,0 +1,61 @@
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import or_
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.models import Paper
+from app.services.markdown import RENDERER_VERSION, render_paper_content
+
+
+def render_stale_papers(db, batch_size: int = 100) -> int:
+    rendered = 0
+    last_id = 0
+
+    while True:
+        papers = db.query(Paper).filter(
+            Paper.id > last_id,
+            or_(
+                Paper.content_html.is_(None),
+                Paper.content_html_version != RENDERER_VERSION,
+            ),
+        ).order_by(Paper.id).limit(batch_size).all()
+
+        if not papers:
+            break
+
+        for paper in papers:
+            render_paper_content(paper)
+
+        db.commit()
+
+        last_id = papers[-1].id
+        rendered += len(papers)
+        print(f"rendered {rendered} papers")
+
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--batch-size", type=int, default=100, help="papers per transaction"
+    )
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        rendered = render_stale_papers(db, batch_size=args.batch_size)
+        print(f"\n{rendered} papers rendered with renderer v{RENDERER_VERSION}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import text
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.models import Paper
+from app.services.search import (
+    SEARCH_TABLE,
+    create_search_table,
+    reindex_papers,
+)
+
+
+def rebuild_search_index(db, batch_size: int = 200) -> int:
+    create_search_table(db)
+    db.commit()
+
+    indexed = 0
+    last_id = 0
+
+    # rows are replaced one batch at a time, so a live site keeps serving
+    # complete results for the whole rebuild
+    while True:
+        paper_ids = [
+            paper_id
+            for paper_id, in db.query(Paper.id).filter(
+                Paper.id > last_id
+            ).order_by(Paper.id).limit(batch_size)
+        ]
+
+        if not paper_ids:
+            break
+
+        indexed += reindex_papers(db, paper_ids)
+        db.commit()
+
+        last_id = paper_ids[-1]
+        print(f"indexed {indexed} papers")
+
+    # rows left behind by papers that no longer exist
+    db.execute(text(
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid NOT IN "
+        "(SELECT id FROM papers WHERE is_published)"
+    ))
+    db.commit()
+
+    db.execute(
+        text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    )
+    db.commit()
+
+    return indexed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--rebuild", action="store_true", help="reindex every published paper"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=200, help="papers per transaction"
+    )
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        if args.rebuild:
+            indexed = rebuild_search_index(db, batch_size=args.batch_size)
+            print(f"\n{indexed} papers in the search index")
+        else:
+            create_search_table(db)
+            db.commit()
+            print("search index table ready")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
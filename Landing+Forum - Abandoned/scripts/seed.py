@@ -12,12 +12,23 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.database import SessionLocal
 from app.models import (
+    Counter,
     User,
     UserRole,
     Paper,
     Vote,
+    paper_tags,
 )
 from app.services.auth import get_password_hash
+from app.services.counters import reconcile_counters
+from app.services.markdown import render_paper_content
+from app.services.search import (
+    create_search_table,
+    index_paper,
+    search_table,
+)
+from app.services.tags import set_paper_tags
+from app.services.trending import refresh_trending_score
 
 fake = Faker()
 
@@ -267,20 +278,24 @@ def create_papers(
 
         tags = random.sample(TECH_TAGS, random.randint(2, 5))
 
+        is_published = random.random() > 0.1
+
         paper = Paper(
             title=title,
             slug=slug,
             content=generate_markdown_content(),
-            tags=",".join(tags),
             author_id=author.id,
-            is_published=random.random() > 0.1,
+            is_published=is_published,
             vote_count=random.randint(0, 100),
             created_at=created_at,
             updated_at=created_at + timedelta(
                 days=random.randint(0, days_ago)
             ),
-            published_at=created_at if random.random() > 0.1 else None,
+            published_at=created_at if is_published else None,
         )
+        set_paper_tags(db, paper, tags)
+        render_paper_content(paper)
+        refresh_trending_score(paper)
 
         papers.append(paper)
         created += 1
@@ -288,10 +303,17 @@ def create_papers(
     db.add_all(papers)
     db.commit()
 
+    # the search index is its own table, nothing fills it on insert
+    for paper in papers:
+        index_paper(db, paper)
+
     for author in authors:
         author.papers_count = db.query(Paper).filter(
-            Paper.author_id == author.id
+            Paper.author_id == author.id,
+            Paper.is_published,
         ).count()
+
+    reconcile_counters(db)
     db.commit()
 
     print(f"created {len(papers)} papers")
@@ -343,6 +365,7 @@ def create_votes(
         paper.vote_count = db.query(Vote).filter(
             Vote.paper_id == paper.id
         ).count()
+        refresh_trending_score(paper)
 
     for user in users:
         user_papers = db.query(Paper).filter(Paper.author_id == user.id).all()
@@ -359,6 +382,10 @@ def create_votes(
 
 
 def clean_database(db: Session):
+    db.execute(paper_tags.delete())
+    db.execute(search_table.delete())
+    db.query(Vote).delete()
+    db.query(Counter).delete()
     db.query(Paper).delete()
     db.query(User).delete()
 
@@ -390,6 +417,9 @@ def main():
     db = SessionLocal()
 
     try:
+        create_search_table(db)
+        db.commit()
+
         if args.clean:
             clean_database(db)
 
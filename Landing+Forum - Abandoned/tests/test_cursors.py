@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.dependencies import Pagination, decode_cursor, encode_cursor
+from app.models import Paper
+
+
+def raw_cursor(payload) -> str:
+    encoded = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(encoded).decode().rstrip("=")
+
+
+def after_cursor(cursor: str, column):
+    return Pagination(cursor=cursor)._after_cursor(column, Paper.id)
+
+
+def compiled(clause) -> dict:
+    return clause.compile().params
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor({"key": "published_at"}),
+    raw_cursor(["published_at", "2024-01-01T00:00:00"]),
+    raw_cursor([1, "2024-01-01T00:00:00", 5]),
+    raw_cursor(["published_at", "2024-01-01T00:00:00", "5"]),
+    raw_cursor(["published_at", "2024-01-01T00:00:00", True]),
+    raw_cursor(["published_at", [1], 5]),
+    raw_cursor(["vote_count", {}, 5]),
+])
+def test_malformed_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("payload, column", [
+    (["vote_count", "abc", 5], Paper.vote_count),
+    (["vote_count", 1.5, 5], Paper.vote_count),
+    (["vote_count", True, 5], Paper.vote_count),
+    (["vote_count", None, 5], Paper.vote_count),
+    (["trending_score", "abc", 5], Paper.trending_score),
+    (["trending_score", float("nan"), 5], Paper.trending_score),
+    (["published_at", 1700000000, 5], Paper.published_at),
+    (["published_at", "yesterday", 5], Paper.published_at),
+    (["published_at", "2024-01-01T00:00:00", 5], Paper.vote_count),
+])
+def test_cursor_value_must_match_sort(payload, column):
+    with pytest.raises(HTTPException) as error:
+        after_cursor(raw_cursor(payload), column)
+
+    assert error.value.status_code == 400
+
+
+def test_cursor_round_trip():
+    published_at = datetime(2024, 1, 1, 12, 30)
+
+    params = compiled(after_cursor(
+        encode_cursor("published_at", published_at, 5), Paper.published_at
+    ))
+    assert published_at in params.values()
+
+    params = compiled(after_cursor(
+        encode_cursor("vote_count", 7, 5), Paper.vote_count
+    ))
+    assert 7 in params.values()
+
+    params = compiled(after_cursor(
+        encode_cursor("trending_score", 3, 5), Paper.trending_score
+    ))
+    assert any(
+        isinstance(value, float) and value == 3.0
+        for value in params.values()
+    )
+
+
+def test_aware_cursor_becomes_naive_utc():
+    params = compiled(after_cursor(
+        raw_cursor(["published_at", "2024-01-01T14:30:00+02:00", 5]),
+        Paper.published_at,
+    ))
+
+    assert datetime(2024, 1, 1, 12, 30) in params.values()
@@ -0,0 +1,47 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.markdown import get_markdown, render_markdown
+
+
+THREADS = 8
+ROUNDS = 25
+
+DOCUMENTS = [
+    "## Introduction\n\nPlain text with *emphasis* and **strong** words.\n",
+    "# Title\n\n## Section\n\n### Subsection\n\nSee www.example.com "
+    "or http://example.org/path?a=1&b=2 for details.\n",
+    "```python\ndef add(a, b):\n    return a < b and a + b\n```\n\n"
+    "Inline `code` and a [link](https://example.com \"title\").\n",
+    "| Name | Value |\n| ---- | ----- |\n| a | 1 |\n| b | 2 |\n",
+    "1. first\n2. second\n    * nested\n    * items\n3. third\n",
+    "\"Smart\" quotes -- dashes... and an & ampersand.\nLine\nbreaks.\n",
+    "<script>alert(1)</script>\n\n<p onclick=\"x\">raw "
+    "<a href=\"javascript:alert(1)\">html</a></p>\n",
+    "> quoted text\n>\n> ## heading in a quote\n\n---\n\n![img](a.png)\n",
+]
+
+
+def test_threads_render_same_output():
+    expected = [render_markdown(document) for document in DOCUMENTS]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        rendered = list(pool.map(render_markdown, DOCUMENTS * ROUNDS))
+
+    assert rendered == expected * ROUNDS
+
+
+def test_threads_get_own_markdown():
+    # the barrier holds every task until all of them run, so each one is on
+    # a thread of its own
+    barrier = threading.Barrier(THREADS)
+
+    def instance(_):
+        barrier.wait(timeout=5)
+        return id(get_markdown())
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        instances = set(pool.map(instance, range(THREADS)))
+
+    assert len(instances) == THREADS
+    assert id(get_markdown()) not in instances
@@ -0,0 +1,75 @@
+import pytest
+
+from app.services.markdown import render_markdown
+from app.services.preview import (
+    BlockCache,
+    _BLOCK_END,
+    block_cache,
+    render_preview,
+    split_blocks,
+)
+
+from test_markdown_threads import DOCUMENTS
+
+
+PREVIEWS = DOCUMENTS + [
+    "\n\n".join(DOCUMENTS),
+    # the block sentinel written by the user
+    f"before\n\n{_BLOCK_END}\n\nafter",
+    f"text {_BLOCK_END} inline\n\n<p>{_BLOCK_END}</p>",
+    f"```\n{_BLOCK_END}\n```\n\nafter",
+    f"# {_BLOCK_END}\n\n{_BLOCK_END}",
+    # fenced code with blank lines inside
+    "```python\nfirst = 1\n\n\nsecond = 2\n```\n\nafter the fence",
+    "~~~\nopen\n\n```\nstill open\n~~~\n\ntail",
+    "```\nnever closed\n\nmore code",
+    # reference links defined in another block
+    "see [the docs][docs] and [home]\n\n[docs]: https://example.com/docs\n"
+    "[home]: https://example.com",
+    "[docs]: https://example.com/docs\n\nthe [docs] come first",
+    # headings repeated across blocks
+    "# Intro\n\ntext\n\n# Intro\n\nmore\n\n# Intro",
+    "## A\n\n## A\n\n## A_1\n\n## A",
+    # lists and quotes that continue past a blank line
+    "* one\n\n* two\n\n    indented\n\n* three\n\nafter",
+    "1. one\n\n2. two\n\nparagraph",
+    "> quote\n\n> more quote\n\nafter",
+    "text\n\n    indented code\n\n    more code\n\nafter",
+    " \nleading whitespace line",
+    "[TOC]\n\n# A\n\n## B",
+    "trailing blank lines\n\n\n\n",
+    "windows\r\n\r\nline endings\r\n",
+]
+
+
+@pytest.mark.parametrize("content", PREVIEWS, ids=range(len(PREVIEWS)))
+def test_matches_full_render(content):
+    block_cache.clear()
+    expected = render_markdown(content)
+
+    assert render_preview(content) == expected
+    # the second render comes from cached blocks
+    assert render_preview(content) == expected
+
+
+def test_fence_spans_blank_lines():
+    blocks = split_blocks("```\na\n\n\nb\n```\n\nafter")
+
+    assert blocks == ["```\na\n\n\nb\n```", "after"]
+
+
+def test_reference_links_render_whole_document():
+    assert split_blocks("[a]\n\n[a]: https://example.com") is None
+
+
+def test_block_cache_evicts_least_recently_used():
+    cache = BlockCache(max_entries=2)
+
+    cache.set("a", ("a", frozenset()))
+    cache.set("b", ("b", frozenset()))
+    cache.get("a")
+    cache.set("c", ("c", frozenset()))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
@@ -0,0 +1,105 @@
+import html as htmllib
+import re
+
+import bleach
+import markdown
+import pytest
+
+from app.services.markdown import (
+    ALLOWED_ATTRIBUTES,
+    ALLOWED_PROTOCOLS,
+    ALLOWED_TAGS,
+    MARKDOWN_EXTENSION_CONFIGS,
+    MARKDOWN_EXTENSIONS,
+    _set_link_attributes,
+    css_sanitizer,
+    sanitize_html,
+)
+
+from test_markdown_threads import DOCUMENTS
+
+
+def two_pass_sanitize(html: str) -> str:
+    # sanitize_html as it was before clean and linkify shared one parse
+    clean_html = bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        css_sanitizer=css_sanitizer,
+        strip=True,
+    )
+
+    return bleach.linkify(
+        clean_html,
+        callbacks=[_set_link_attributes],
+        skip_tags=["pre", "code"],
+        parse_email=False,
+    )
+
+
+_CODE = re.compile(r"<(pre|code)([^>]*)>(.*?)</\1>", re.S)
+
+
+def escaped_once(html: str) -> str:
+    # undoes the second escape two_pass_sanitize gives pre and code text,
+    # see test_code_escaped_once
+    return _CODE.sub(
+        lambda m: f"<{m[1]}{m[2]}>{htmllib.unescape(m[3])}</{m[1]}>", html
+    )
+
+
+def convert(document: str) -> str:
+    md = markdown.Markdown(
+        extensions=MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+    )
+    return md.convert(document)
+
+
+HTML = [
+    '<script>alert(1)</script><p onclick="x">hi '
+    '<a href="javascript:alert(1)">x</a> http://ok.com</p>',
+    '<a href="http://a.com" target="_self">http://a.com</a> '
+    '<img src="data:x" onerror="y">',
+    '<p style="color: red; position: absolute">styled</p>'
+    '<div class="x" id="y">d</div>',
+    '<table><tr><td colspan="2">http://t.com</td></tr></table>',
+    "&lt;script&gt; &amp;amp; <b>bold</b><iframe src=\"x\"></iframe>",
+    "<details><summary>s</summary>www.google.com/path</details>",
+    "<p>unclosed <em>tag",
+    "<a>no href</a> ftp://f.org mailto me@example.com",
+    '<h1 id="a">A<a class="toc-link" href="#a" '
+    'title="Permanent link">&para;</a></h1>',
+    "<p>a &lt; b &copy; &#169; &#xa9; &unknown; & c</p>",
+    "<pre><code>www.example.com</code></pre><code>http://x.io</code>",
+    # urls running into entities
+    "<p>http://x.com/&copy; x</p>",
+    "<p>http://a.com/a&lt;b http://a.com/&gt;) (http://a.com/&#169;x)</p>",
+    "<p>http://a.com/?a=1&amp;amp;b http://a.com/?a=1&amp;b=2</p>",
+    "<p>&ldquo;http://a.com/x&rdquo; &lsquo;www.a.com&rsquo;</p>",
+    "<p>www.a.com&nbsp;x http://a.com/&unknown; z</p>",
+    "<p>http://a.com/?q=&quot;x&quot; &lt;http://a.com&gt;</p>",
+    '<p><a href="http://a.com/?a=1&amp;b">http://a.com/?a=1&amp;b</a></p>',
+]
+
+
+SAMPLES = [convert(document) for document in DOCUMENTS] + HTML
+
+
+@pytest.mark.parametrize("html", SAMPLES, ids=range(len(SAMPLES)))
+def test_matches_two_pass(html):
+    assert sanitize_html(html) == escaped_once(two_pass_sanitize(html))
+
+
+def test_code_escaped_once():
+    # linkify re-parsed the output of clean and escaped the text inside
+    # pre and code a second time, one pass leaves it escaped once
+    html = "<pre><code>if a &lt; b &amp;&amp; c:</code></pre>"
+
+    assert two_pass_sanitize(html) == (
+        "<pre><code>if a &amp;lt; b &amp;amp;&amp;amp; c:</code></pre>"
+    )
+    assert sanitize_html(html) == (
+        "<pre><code>if a &lt; b &amp;&amp; c:</code></pre>"
+    )